@@ -0,0 +1,67 @@
+"""Benchmark de ``transpile_many`` frente a un proceso por archivo.
+
+Genera ``--files`` archivos ``.prisma`` (como ``bench_build``) y compara
+transpilarlos lanzando un intérprete por archivo, como hacía el CI con
+``opn transpile``, con una sola llamada a ``transpile_many``.
+
+Uso:
+    python benchmarks/bench_batch.py [--files 200] [--jobs 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_build import build_project  # noqa: E402
+from prisma.core.batch import collect_sources, transpile_many  # noqa: E402
+
+# Lo mínimo que hace 'opn transpile <archivo> -o <salida>' sin la CLI.
+PER_FILE_SCRIPT = (
+    "import sys\n"
+    "from prisma.core import transpile_path\n"
+    "open(sys.argv[2], 'w', encoding='utf-8').write(transpile_path(sys.argv[1]))\n"
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de transpilación por lotes")
+    parser.add_argument("--files", type=int, default=200, help="Número de archivos .prisma")
+    parser.add_argument("--jobs", type=int, default=1, help="Procesos para transpile_many (0 = uno por CPU)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp) / "project"
+        project.mkdir()
+        build_project(project, args.files)
+        sources = collect_sources(str(project))
+
+        start = time.perf_counter()
+        for index, source in enumerate(sources):
+            output = Path(tmp) / f"single{index}.py"
+            subprocess.run([sys.executable, "-c", PER_FILE_SCRIPT, str(source), str(output)], env=env, check=True)
+        per_file = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = transpile_many(sources, output_dir=str(Path(tmp) / "batch"), jobs=args.jobs, root=str(project))
+        batch = time.perf_counter() - start
+
+    print(f"Archivos: {len(sources)} ({summary['failed']} con errores), jobs={summary['jobs']}")
+    print(f"  un proceso por archivo: {per_file * 1000:9.1f} ms")
+    print(f"  transpile_many        : {batch * 1000:9.1f} ms")
+    print(f"  speedup               : {per_file / batch:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""Benchmark de ``opn compile`` sobre un proyecto sintético de muchos archivos.
+
+Genera un proyecto temporal con ``--files`` archivos ``.prisma`` (copias de
+los ejemplos de ``render``), y mide una compilación completa, una
+recompilación sin cambios y una recompilación tras tocar un solo archivo.
+
+Uso:
+    python benchmarks/bench_build.py [--files 400] [--jobs 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_lexer import FALLBACK_SOURCE, RENDER_DIR  # noqa: E402
+from prisma.api.compilation_api import compile_project  # noqa: E402
+
+
+def build_project(root: Path, files: int) -> None:
+    sources = [path.read_text(encoding="utf-8") for path in sorted(RENDER_DIR.rglob("*.prisma"))] or [FALLBACK_SOURCE]
+    for index in range(files):
+        module = root / f"mod{index // 50:02d}"
+        module.mkdir(exist_ok=True)
+        # Renombrar las funciones para que cada archivo aporte funciones distintas
+        source = sources[index % len(sources)].replace("func ", f"func m{index}_")
+        (module / f"file{index:04d}.prisma").write_text(source, encoding="utf-8")
+
+
+def timed(label: str, func) -> dict:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<16}: {elapsed * 1000:9.1f} ms  ({result['files_changed']} files reprocessed)")
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de opn compile")
+    parser.add_argument("--files", type=int, default=400, help="Número de archivos .prisma del proyecto")
+    parser.add_argument("--jobs", type=int, default=1, help="Procesos para compile_project (0 = uno por CPU)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp) / "project"
+        output = Path(tmp) / "build"
+        project.mkdir()
+        build_project(project, args.files)
+
+        def compile_it(incremental: bool = True) -> dict:
+            return compile_project(str(project), str(output), name="bench", incremental=incremental, jobs=args.jobs)
+
+        print(f"Proyecto: {args.files} archivos, jobs={args.jobs}")
+        timed("full build", lambda: compile_it(incremental=False))
+        timed("no-change", compile_it)
+        touched = next(project.rglob("*.prisma"))
+        touched.write_text(touched.read_text(encoding="utf-8") + "\nfunc tocada() { return 1; }\n", encoding="utf-8")
+        timed("one file edited", compile_it)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
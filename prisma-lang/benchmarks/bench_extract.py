@@ -0,0 +1,69 @@
+"""Benchmark de ``FunctionExtractor.extract_with_documentation``.
+
+Compara el extractor basado en el ``Lexer`` (una pasada con comentarios como
+trivia) con el extractor por expresiones regulares que se usaba antes, que
+hacía un ``re.search`` sobre todo el código por cada función encontrada.
+
+Uso:
+    python benchmarks/bench_extract.py [--lines 5000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_lexer import best_of, build_corpus  # noqa: E402
+from prisma.api.compilation_api import FunctionExtractor  # noqa: E402
+
+
+class LegacyFunctionExtractor:
+    """Extractor por expresiones regulares previo, conservado solo como referencia."""
+
+    function_pattern = re.compile(r'func\s+(\w+)\s*\((.*?)\)\s*(?:->|{)', re.MULTILINE | re.DOTALL)
+
+    def extract_with_documentation(self, code: str):
+        functions = [
+            {"name": match.group(1), "description": ""}
+            for match in self.function_pattern.finditer(code)
+        ]
+        for func in functions:
+            doc_match = re.search(rf'//\s*(.*?)func\s+{func["name"]}\s*\(', code, re.DOTALL)
+            if doc_match:
+                func["description"] = doc_match.group(1).strip()
+        return functions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del extractor de funciones")
+    parser.add_argument("--lines", type=int, default=5000, help="Tamaño aproximado del bundle en líneas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones (se toma la mejor)")
+    args = parser.parse_args()
+
+    # Un comentario '//' al principio, como la cabecera que añade consolidate_code,
+    # y nombres de función únicos por copia, como en un paquete real.
+    unit = build_corpus(1)
+    copies = max(1, args.lines // max(1, unit.count("\n")))
+    source = "// === From: bench.prisma ===\n" + "\n".join(
+        unit.replace("func ", f"func c{index}_") for index in range(copies)
+    )
+    count = len(FunctionExtractor().extract_with_documentation(source))
+
+    legacy = best_of(args.repeat, lambda: LegacyFunctionExtractor().extract_with_documentation(source))
+    lexer = best_of(args.repeat, lambda: FunctionExtractor().extract_with_documentation(source))
+
+    print(f"Bundle: {source.count(chr(10)) + 1} líneas, {count} funciones")
+    print(f"  regex  : {legacy * 1000:9.1f} ms")
+    print(f"  lexer  : {lexer * 1000:9.1f} ms")
+    print(f"  speedup: {legacy / lexer:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
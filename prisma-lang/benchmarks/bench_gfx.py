@@ -0,0 +1,99 @@
+"""Benchmark del backend raster de ``pygfx_api`` con las animaciones de ``render/examples``.
+
+Ejecuta todas las funciones ``animated_*`` de ``ejemplo_animacion.prisma`` con
+``RasterBackend`` y mide fotogramas por segundo sin guardar nada, guardando
+cada fotograma como PPM y guardándolo como PNG. Después rellena 500x500
+píxeles con ``gfx.draw_point`` y cuenta los comandos que llegan al backend
+tras fusionar los puntos en la lista de visualización.
+
+Uso:
+    python benchmarks/bench_gfx.py [--example ruta.prisma]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from prisma.api import pygfx_api  # noqa: E402
+from prisma.api.gfx_backends import RasterBackend  # noqa: E402
+from prisma.core import transpile_path  # noqa: E402
+
+DEFAULT_EXAMPLE = ROOT.parent / "render" / "examples" / "ejemplo_animacion.prisma"
+
+
+def run_animations(namespace: dict, backend: RasterBackend) -> int:
+    pygfx_api.set_backend(backend)
+    with contextlib.redirect_stdout(io.StringIO()):  # Sin los mensajes de setup_canvas/quit
+        for name, func in namespace.items():
+            if name.startswith("animated_") and callable(func):
+                func()
+        pygfx_api.quit()
+    return backend.frame
+
+
+class CountingBackend(RasterBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches = 0
+        self.commands = 0
+
+    def draw_batch(self, commands) -> None:
+        self.batches += 1
+        self.commands += len(commands)
+        super().draw_batch(commands)
+
+
+def fill_points(size: int) -> CountingBackend:
+    backend = CountingBackend()
+    pygfx_api.set_backend(backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pygfx_api.setup_canvas(size, size, "fill")
+        for y in range(size):
+            for x in range(size):
+                pygfx_api.draw_point(x, y, "Rojo")
+        pygfx_api.update_screen()
+        pygfx_api.quit()
+    return backend
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del backend raster de gfx")
+    parser.add_argument("--example", default=str(DEFAULT_EXAMPLE), help="Script .prisma con funciones animated_*")
+    args = parser.parse_args()
+
+    namespace = {"__name__": "bench"}
+    exec(compile(transpile_path(args.example), args.example, "exec"), namespace)
+
+    print(f"Animaciones de {Path(args.example).name}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, backend in (
+            ("en memoria", RasterBackend()),
+            ("PPM", RasterBackend(output_dir=str(Path(tmp) / "ppm"), image_format="ppm")),
+            ("PNG", RasterBackend(output_dir=str(Path(tmp) / "png"), image_format="png")),
+        ):
+            start = time.perf_counter()
+            frames = run_animations(namespace, backend)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<10}: {frames} fotogramas en {elapsed * 1000:8.1f} ms ({frames / elapsed:7.1f} fps)")
+
+    start = time.perf_counter()
+    backend = fill_points(500)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Relleno 500x500 punto a punto: {elapsed * 1000:.1f} ms, "
+        f"{backend.batches} envío(s) al backend con {backend.commands} comandos"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,239 @@
+"""Benchmark del lexer de OPN.
+
+Compara el lexer actual con el escáner carácter a carácter que usaba el
+transpilador antes, sobre un bundle grande construido a partir de los
+ejemplos del paquete ``render``, y mide la memoria que retiene
+``TokenBuffer`` frente a una lista de objetos ``Token``.
+
+Todos los tiempos incluyen construir cada ``Token`` con su línea y columna:
+``iter_tokens`` es lo que usa ``transpile()``, y ``TokenBuffer`` (el
+resultado de ``tokenize``) se recorre entero, porque por sí solo es perezoso.
+
+Uso:
+    python benchmarks/bench_lexer.py [--lines 40000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from prisma.core.transpiler import (  # noqa: E402
+    EOF,
+    IDENT,
+    KEYWORDS,
+    MULTI_SYMBOLS,
+    NUMBER,
+    STRING,
+    SYMBOLS,
+    Lexer,
+    Token,
+    TranspilerError,
+)
+
+RENDER_DIR = ROOT.parent / "render"
+
+FALLBACK_SOURCE = """
+# Programa sintético para el benchmark
+func fib(n) {
+    if n < 2 {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+
+main {
+    let total = 0;
+    for i in 1..30 {
+        total = total + fib(i) * 2.5;
+        py.print("valor: ", total, "\\n");
+    }
+}
+"""
+
+
+class LegacyLexer:
+    """Escáner carácter a carácter previo, conservado solo como referencia."""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.length = len(source)
+        self.index = 0
+        self.line = 1
+        self.column = 1
+
+    def tokenize(self):
+        tokens = []
+        while not self._is_at_end():
+            char = self._peek()
+            if char in " \t\r\n":
+                self._consume_whitespace()
+                continue
+            if char == "#" or (char == "/" and self._peek_next() == "/"):
+                self._consume_comment()
+                continue
+            tokens.append(self._read_token())
+        tokens.append(Token(EOF, "", self.line, self.column))
+        return tokens
+
+    def _read_token(self):
+        if self._peek() == "/" and self._peek_next() == "*":
+            self._consume_block_comment()
+            return self._read_token()
+        line, column = self.line, self.column
+        char = self._advance()
+        pair = char + (self._peek() if not self._is_at_end() else "")
+        if pair in MULTI_SYMBOLS:
+            self._advance()
+            return Token(MULTI_SYMBOLS[pair], pair, line, column)
+        if char in SYMBOLS:
+            return Token(SYMBOLS[char], char, line, column)
+        if char.isalpha() or char == "_":
+            value = [char]
+            while not self._is_at_end() and (self._peek().isalnum() or self._peek() in {"_"}):
+                value.append(self._advance())
+            text = "".join(value)
+            return Token(KEYWORDS.get(text, IDENT), text, line, column)
+        if char.isdigit():
+            value = [char]
+            has_decimal = False
+            while not self._is_at_end():
+                current = self._peek()
+                if current == "." and not has_decimal and self._peek_next() != ".":
+                    has_decimal = True
+                    value.append(self._advance())
+                    continue
+                if current.isdigit():
+                    value.append(self._advance())
+                    continue
+                break
+            return Token(NUMBER, "".join(value), line, column)
+        if char == '"':
+            value = []
+            escapes = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+            while not self._is_at_end():
+                current = self._advance()
+                if current == '"':
+                    return Token(STRING, "".join(value), line, column)
+                if current == "\\":
+                    value.append(escapes[self._advance()])
+                else:
+                    value.append(current)
+            raise TranspilerError("Unterminated string")
+        raise TranspilerError(f"Unexpected character '{char}'")
+
+    def _consume_whitespace(self):
+        while not self._is_at_end() and self._peek() in " \t\r\n":
+            if self._advance() == "\n":
+                self.line += 1
+                self.column = 1
+
+    def _consume_comment(self):
+        while not self._is_at_end() and self._peek() != "\n":
+            self._advance()
+        if not self._is_at_end():
+            self._advance()
+            self.line += 1
+            self.column = 1
+
+    def _consume_block_comment(self):
+        self._advance()
+        self._advance()
+        while not self._is_at_end() and not (self._peek() == "*" and self._peek_next() == "/"):
+            if self._peek() == "\n":
+                self.line += 1
+                self.column = 1
+            self._advance()
+        self._advance()
+        self._advance()
+
+    def _peek(self):
+        return self.source[self.index]
+
+    def _peek_next(self):
+        if self.index + 1 >= self.length:
+            return "\0"
+        return self.source[self.index + 1]
+
+    def _advance(self):
+        char = self.source[self.index]
+        self.index += 1
+        self.column += 1
+        return char
+
+    def _is_at_end(self):
+        return self.index >= self.length
+
+
+def build_corpus(target_lines: int) -> str:
+    if RENDER_DIR.is_dir():
+        chunks = [path.read_text(encoding="utf-8") for path in sorted(RENDER_DIR.rglob("*.prisma"))]
+        unit = "\n".join(chunks)
+    else:
+        unit = FALLBACK_SOURCE
+    unit_lines = max(1, unit.count("\n"))
+    return "\n".join([unit] * max(1, target_lines // unit_lines))
+
+
+def best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained_kib(func) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size // 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del lexer de OPN")
+    parser.add_argument("--lines", type=int, default=40000, help="Tamaño aproximado del bundle en líneas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones (se toma la mejor)")
+    args = parser.parse_args()
+
+    source = build_corpus(args.lines)
+    legacy_tokens = [tuple((t.kind, t.value, t.line, t.column)) for t in LegacyLexer(source).tokenize()]
+    for name, tokens in (("iter_tokens", Lexer(source).iter_tokens()), ("tokenize", Lexer(source).tokenize())):
+        if [tuple((t.kind, t.value, t.line, t.column)) for t in tokens] != legacy_tokens:
+            print(f"ERROR: {name} no produce los mismos tokens que el escáner anterior", file=sys.stderr)
+            return 1
+    token_count = len(legacy_tokens)
+    del legacy_tokens
+
+    legacy = best_of(args.repeat, lambda: LegacyLexer(source).tokenize())
+    streaming = best_of(args.repeat, lambda: list(Lexer(source).iter_tokens()))
+    buffered = best_of(args.repeat, lambda: list(Lexer(source).tokenize()))
+
+    print(f"Bundle: {source.count(chr(10)) + 1} líneas, {len(source)} bytes, {token_count} tokens")
+    print(f"  legacy          : {legacy * 1000:9.1f} ms  ({token_count / legacy:12,.0f} tokens/s)")
+    for name, seconds in (("iter_tokens", streaming), ("tokenize + leer", buffered)):
+        print(
+            f"  {name:<16}: {seconds * 1000:9.1f} ms  ({token_count / seconds:12,.0f} tokens/s)"
+            f"  {legacy / seconds:.1f}x"
+        )
+
+    as_list = retained_kib(lambda: list(Lexer(source).iter_tokens()))
+    as_buffer = retained_kib(lambda: Lexer(source).tokenize())
+    print(f"Memoria retenida: List[Token] {as_list:,} KiB, TokenBuffer {as_buffer:,} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
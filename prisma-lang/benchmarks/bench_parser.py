@@ -0,0 +1,42 @@
+"""Benchmark de rendimiento del parser de OPN (tokens/s).
+
+Tokeniza una vez el bundle de ``bench_lexer`` y mide solo ``Parser.parse``
+sobre la lista de tokens ya materializada, para aislar el coste del parser
+del coste del lexer.
+
+Uso:
+    python benchmarks/bench_parser.py [--lines 40000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_lexer import best_of, build_corpus  # noqa: E402
+from prisma.core.transpiler import Lexer, Parser  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del parser de OPN")
+    parser.add_argument("--lines", type=int, default=40000, help="Tamaño aproximado del bundle en líneas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones (se toma la mejor)")
+    args = parser.parse_args()
+
+    source = build_corpus(args.lines)
+    tokens = list(Lexer(source).tokenize())
+
+    elapsed = best_of(args.repeat, lambda: Parser(tokens).parse())
+
+    print(f"Bundle: {source.count(chr(10)) + 1} líneas, {len(tokens)} tokens")
+    print(f"  parse  : {elapsed * 1000:9.1f} ms  ({len(tokens) / elapsed:12,.0f} tokens/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
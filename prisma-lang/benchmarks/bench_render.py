@@ -0,0 +1,164 @@
+"""Benchmark del paquete ``render`` antes y después de las primitivas en bloque.
+
+Compara las funciones de ``render/index.prisma`` (con ``gfx.fill_rect``,
+``gfx.draw_points`` y ``gfx.draw_circles``) con sus versiones anteriores,
+que dibujaban punto a punto con ``gfx.draw_point`` y están copiadas abajo.
+Para cada una mide el tiempo con ``RasterBackend`` en memoria, las llamadas
+a ``gfx`` y los comandos que llegan al backend.
+
+Uso:
+    python benchmarks/bench_render.py [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from prisma.api import pygfx_api  # noqa: E402
+from prisma.api.gfx_backends import RasterBackend  # noqa: E402
+from prisma.core import transpile, transpile_path  # noqa: E402
+
+RENDER_INDEX = ROOT.parent / "render" / "index.prisma"
+
+# Versiones punto a punto, tal como estaban en render/ antes de portarlas
+BEFORE_SOURCE = """
+func draw_square(x, y, size, color) {
+    let row = 0;
+    let col = 0;
+    for row in 1..size {
+        for col in 1..size {
+            gfx.draw_point(x + col, y + row, color);
+        }
+    }
+}
+
+func draw_rectangle(x, y, width, height, color) {
+    let row = 0;
+    let col = 0;
+    for row in 1..height {
+        for col in 1..width {
+            gfx.draw_point(x + col, y + row, color);
+        }
+    }
+}
+
+func draw_border(x, y, width, height, color) {
+    let i = 0;
+    for i in 1..width {
+        gfx.draw_point(x + i, y, color);
+        gfx.draw_point(x + i, y + height, color);
+    }
+    for i in 1..height {
+        gfx.draw_point(x, y + i, color);
+        gfx.draw_point(x + width, y + i, color);
+    }
+}
+
+func draw_grid(grid_x, grid_y, grid_width, grid_height, cell_size, color) {
+    let row = 0;
+    let col = 0;
+    for row in 1..20 {
+        for col in 1..20 {
+            gfx.draw_point(grid_x + col * cell_size, grid_y + row * cell_size, color);
+        }
+    }
+}
+
+func draw_concentric_circles(x, y, num_circles, spacing, color) {
+    let i = 0;
+    for i in 1..num_circles {
+        gfx.draw_circle(x, y, i * spacing, color);
+    }
+}
+
+func spiral_effect(center_x, center_y, color, num_points) {
+    let i = 0;
+    for i in 1..num_points {
+        gfx.draw_point(center_x + i * 5, center_y + i * 3, color);
+    }
+}
+
+func rain_effect(color, num_drops) {
+    let drop = 0;
+    let frame = 0;
+    for frame in 1..50 {
+        for drop in 1..num_drops {
+            gfx.draw_point(100 + drop * 50, 50 + frame * 5, color);
+        }
+        gfx.update_screen();
+    }
+}
+"""
+
+CASES = [
+    ("draw_square", (10, 10, 200, "Rojo")),
+    ("draw_rectangle", (50, 20, 400, 300, "Azul")),
+    ("draw_border", (5, 5, 600, 500, "Verde")),
+    ("draw_grid", (0, 0, 0, 0, 25, "Cian")),
+    ("draw_concentric_circles", (400, 300, 20, 12, "Amarillo")),
+    ("spiral_effect", (10, 10, "Púrpura", 120)),
+    ("rain_effect", ("Azul", 12)),
+]
+
+
+class CountingBackend(RasterBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.commands = 0
+
+    def draw_batch(self, commands) -> None:
+        self.commands += len(commands)
+        super().draw_batch(commands)
+
+
+def load(python_code: str, filename: str) -> dict:
+    namespace = {"__name__": "bench"}
+    exec(compile(python_code, filename, "exec"), namespace)
+    return namespace
+
+
+def measure(func, args, repeat: int):
+    """Media en ms por llamada, llamadas a gfx y comandos enviados al backend."""
+    backend = CountingBackend()
+    pygfx_api.set_backend(backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pygfx_api.setup_canvas(800, 600, "bench")
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(*args)
+            pygfx_api.update_screen()
+        elapsed = time.perf_counter() - start
+        calls = pygfx_api._DRAW_CALL_COUNT
+        pygfx_api.quit()
+    return elapsed * 1000 / repeat, calls // repeat, backend.commands // repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de render/ con primitivas en bloque")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones de cada función")
+    args = parser.parse_args()
+
+    before = load(transpile(BEFORE_SOURCE, source_file="<antes>"), "<antes>")
+    after = load(transpile_path(str(RENDER_INDEX)), str(RENDER_INDEX))
+
+    print(f"{'función':<26}{'antes ms':>10}{'después ms':>12}{'x':>7}{'llamadas gfx':>16}{'comandos':>14}")
+    for name, call_args in CASES:
+        old_ms, old_calls, old_commands = measure(before[name], call_args, args.repeat)
+        new_ms, new_calls, new_commands = measure(after[name], call_args, args.repeat)
+        print(
+            f"{name:<26}{old_ms:>10.3f}{new_ms:>12.3f}{old_ms / new_ms:>7.1f}"
+            f"{f'{old_calls} -> {new_calls}':>16}{f'{old_commands} -> {new_commands}':>14}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
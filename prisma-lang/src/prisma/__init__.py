@@ -1,5 +1,16 @@
-from .core import TranspilerError, transpile
-from .api import pygfx_api, server_api
+import importlib
+
+from .core import OPNTranspiler, TranspilerError, transpile, transpile_path
+
+# Las APIs de gráficos (tkinter) y servidor se cargan al usarse (PEP 562).
+_LAZY_MODULES = {"pygfx_api": ".api.pygfx_api", "server_api": ".api.server_api"}
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        return importlib.import_module(_LAZY_MODULES[name], __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "OPNTranspiler",
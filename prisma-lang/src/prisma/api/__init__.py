@@ -1,6 +1,14 @@
-from . import pygfx_api
-from . import server_api
-from . import compilation_api
-from . import config_api
+import importlib
+
+# Los submódulos se cargan al usarse (PEP 562), para que importar uno no
+# arrastre tkinter ni http.server si no hacen falta.
+_SUBMODULES = ("pygfx_api", "server_api", "compilation_api", "config_api")
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["pygfx_api", "server_api", "compilation_api", "config_api"]
@@ -1,79 +1,131 @@
 import os
 import json
-import re
+import hashlib
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from .config_api import ConfigManager
+from prisma.core.cache import source_stamp, transpiler_fingerprint, write_bytecode
+from prisma.core.transpiler import COMMA, COMMENT, FUNC, IDENT, LPAREN, RPAREN, Lexer, Token, TranspilerError, transpile
 
 
 class FunctionExtractor:
-    def __init__(self):
-        self.function_pattern = re.compile(
-            r'func\s+(\w+)\s*\((.*?)\)\s*(?:->|{)',
-            re.MULTILINE | re.DOTALL
-        )
-        self.docstring_pattern = re.compile(
-            r'//\s*(.*?)(?=\n(?:func|class|let|\Z))',
-            re.MULTILINE | re.DOTALL
-        )
+    """Extrae firmas de funciones y sus comentarios de documentación.
+
+    Recorre una sola vez los tokens del ``Lexer`` con los comentarios como
+    trivia: el bloque de comentarios consecutivos que termina justo en la línea
+    anterior a un ``func`` es su descripción. El coste es lineal en el tamaño
+    del código, sin búsquedas por función.
+    """
 
     def extract_functions(self, code: str) -> List[Dict]:
-        functions = []
-        for match in self.function_pattern.finditer(code):
-            func_name = match.group(1)
-            params_str = match.group(2).strip()
-            
-            params = []
-            if params_str:
-                for param in params_str.split(','):
-                    param = param.strip()
-                    if param:
-                        parts = param.split(':')
-                        param_name = parts[0].strip()
-                        param_type = parts[1].strip() if len(parts) > 1 else "any"
-                        params.append({
-                            "name": param_name,
-                            "type": param_type
-                        })
-            
-            functions.append({
-                "name": func_name,
-                "parameters": params,
-                "description": "",
-                "category": "core",
-                "returnType": "any"
-            })
-        
-        return functions
+        return self._extract(code, with_documentation=False)
 
     def extract_with_documentation(self, code: str) -> List[Dict]:
-        functions = self.extract_functions(code)
-        
-        for func in functions:
-            doc_match = re.search(
-                rf'//\s*(.*?)func\s+{func["name"]}\s*\(',
-                code,
-                re.DOTALL
-            )
-            if doc_match:
-                doc_text = doc_match.group(1).strip()
-                doc_lines = [line.strip().lstrip('//').strip() 
-                           for line in doc_text.split('\n') if line.strip()]
-                if doc_lines:
-                    func["description"] = ' '.join(doc_lines)
-        
+        return self._extract(code, with_documentation=True)
+
+    def _extract(self, code: str, with_documentation: bool) -> List[Dict]:
+        functions = []
+        doc_lines: List[str] = []
+        doc_end_line = 0
+        tokens = Lexer(code, keep_comments=True).iter_tokens()
+        try:
+            for token in tokens:
+                if token.kind == COMMENT:
+                    if not doc_lines or token.line != doc_end_line + 1:
+                        doc_lines = []
+                    doc_lines.extend(self._comment_lines(token.value))
+                    doc_end_line = token.line + token.value.count("\n")
+                    continue
+                if token.kind == FUNC:
+                    description = ""
+                    if with_documentation and doc_lines and doc_end_line == token.line - 1:
+                        description = " ".join(doc_lines)
+                    function = self._signature(tokens)
+                    if function is not None:
+                        function["description"] = description
+                        functions.append(function)
+                doc_lines = []
+        except TranspilerError:
+            # Código que el Lexer no acepta: se devuelve lo extraído hasta ahí.
+            pass
         return functions
 
+    @staticmethod
+    def _signature(tokens: Iterator[Token]) -> Optional[Dict]:
+        """Lee ``nombre ( parámetros )`` tras un ``func``; ``None`` si no encaja."""
+        name = next(tokens)
+        if name.kind != IDENT or next(tokens).kind != LPAREN:
+            return None
+        params = []
+        for token in tokens:
+            if token.kind == IDENT:
+                params.append({"name": token.value, "type": "any"})
+            elif token.kind == RPAREN:
+                break
+            elif token.kind not in (COMMA, COMMENT):
+                return None
+        return {
+            "name": name.value,
+            "parameters": params,
+            "description": "",
+            "category": "core",
+            "returnType": "any"
+        }
+
+    @staticmethod
+    def _comment_lines(comment: str) -> List[str]:
+        if comment.startswith("/*"):
+            lines = [line.strip().lstrip("*").strip() for line in comment[2:-2].split("\n")]
+        else:
+            lines = [comment.lstrip("#/").strip()]
+        return [line for line in lines if line]
+
+
+def _process_source_file(file_path: Path) -> Dict:
+    """Lee un archivo fuente y extrae sus funciones.
+
+    Se ejecuta en los procesos de ``ProjectCompiler._process_files``, así que
+    no toca estado compartido y devuelve solo datos serializables.
+    """
+    try:
+        content = file_path.read_text(encoding='utf-8')
+    except Exception as e:
+        return {"error": str(e)}
+    result = {
+        "error": None,
+        "sha256": hashlib.sha256(content.encode('utf-8')).hexdigest(),
+        "chunk": None,
+        "functions": [],
+    }
+    if content.strip():
+        chunk = ProjectCompiler._file_chunk(file_path, content)
+        result["chunk"] = chunk
+        result["functions"] = FunctionExtractor().extract_with_documentation(chunk)
+    return result
+
 
 class ProjectCompiler:
-    def __init__(self, project_path: str):
+    # El manifiesto guarda, por archivo fuente, mtime, tamaño, hash, funciones
+    # extraídas y la posición de su fragmento dentro de index.prisma, para que
+    # una recompilación solo vuelva a procesar los archivos que cambiaron.
+    MANIFEST_NAME = "build-manifest.json"
+    MANIFEST_FORMAT = "opn-build-manifest-v2"
+
+    def __init__(self, project_path: str, jobs: int = 1):
         self.project_path = Path(project_path)
+        # Procesos para leer y extraer archivos en paralelo (0 = uno por CPU)
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
         self.source_files = []
         self.all_code = ""
         self.functions = []
         self.metadata = {}
         self.extractor = FunctionExtractor()
+        # (archivo, fragmento de index.prisma, funciones) por cada archivo no vacío
+        self.file_chunks: List[Tuple[Path, str, List[Dict]]] = []
+        # ruta relativa -> {"mtime", "size", "sha256"} de la última compilación
+        self.file_stats: Dict[str, Dict] = {}
 
     def discover_source_files(self, extensions: List[str] = None) -> List[Path]:
         if extensions is None:
@@ -91,27 +143,37 @@ class ProjectCompiler:
         return self.source_files
 
     def consolidate_code(self) -> str:
-        consolidated = []
+        self.file_chunks = []
         
         for file_path in self.source_files:
             try:
                 content = file_path.read_text(encoding='utf-8')
                 if content.strip():
-                    consolidated.append(f"\n// === From: {file_path.name} ===\n")
-                    consolidated.append(content)
+                    self.file_chunks.append((file_path, self._file_chunk(file_path, content), []))
             except Exception as e:
                 print(f"Warning: Could not read {file_path}: {e}")
         
-        self.all_code = '\n'.join(consolidated)
+        self.all_code = '\n'.join(chunk for _, chunk, _ in self.file_chunks)
         return self.all_code
 
     def extract_all_functions(self) -> List[Dict]:
-        self.functions = self.extractor.extract_with_documentation(self.all_code)
+        # Se extrae archivo por archivo para que la documentación de una función
+        # dependa solo de su propio archivo y el resultado se pueda reutilizar.
+        self.file_chunks = [
+            (file_path, chunk, self.extractor.extract_with_documentation(chunk))
+            for file_path, chunk, _ in self.file_chunks
+        ]
+        self.functions = [func for _, _, functions in self.file_chunks for func in functions]
         return self.functions
 
+    @staticmethod
+    def _file_chunk(file_path: Path, content: str) -> str:
+        return f"\n// === From: {file_path.name} ===\n\n{content}"
+
     def generate_index_prisma(self, output_path: Path) -> str:
         header = f"// Auto-generated index.prisma\n// Generated: {datetime.now().isoformat()}\n// Source files: {len(self.source_files)}\n\n"
         content = header + self.all_code
+        self.index_code_offset = len(header)
         
         output_path.write_text(content, encoding='utf-8')
         return content
@@ -186,25 +248,254 @@ class ProjectCompiler:
         
         return opn_file
 
-    def compile_project(self, output_dir: str, metadata: Dict) -> Dict:
+    def compile_project(
+        self, output_dir: str, metadata: Dict, incremental: bool = True, precompile: bool = False
+    ) -> Dict:
+        """Genera el paquete en ``output_dir``.
+
+        Con ``precompile`` también escribe index.py e index.pyc. Es opcional
+        porque transpila el paquete entero: en una compilación incremental
+        costaría casi lo mismo que una completa. Si el código consolidado no
+        cambió, index.prisma no se reescribe y el precompilado vigente se
+        conserva; si falta o no corresponde, se genera aunque ningún fuente
+        haya cambiado.
+        """
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
+        opn_path = output_path / f"{metadata.get('name', 'package')}.opn"
         
         self.discover_source_files()
-        self.consolidate_code()
-        self.extract_all_functions()
+        manifest = self.load_manifest(output_path) if incremental else None
+        if (
+            manifest is not None
+            and manifest.get("metadata") == metadata
+            and manifest.get("compiledWith") == transpiler_fingerprint()
+            and opn_path.exists()
+            and (output_path / "index.prisma").exists()
+            and (output_path / "functions.json").exists()
+        ):
+            if self._is_up_to_date(manifest):
+                compiled_files = 0
+                if precompile:
+                    # Fuentes sin cambios, pero la compilación anterior pudo ser sin precompilado
+                    index_content = (output_path / "index.prisma").read_text(encoding='utf-8')
+                    compiled_files = self.generate_compiled_python(output_path, index_content)
+                return self._result(output_path, manifest, files_changed=0, files_generated=compiled_files)
+
+        previous_code = self._previous_index_code(output_path, manifest)
+        files_changed = self._collect_chunks(previous_code, manifest)
         
-        self.generate_index_prisma(output_path / "index.prisma")
+        index_path = output_path / "index.prisma"
+        if previous_code is not None and previous_code == self.all_code:
+            # Mismo código: conservar index.prisma (y su hash) evita transpilar de nuevo
+            self.index_code_offset = manifest["index"].get("codeOffset", 0)
+            index_content = index_path.read_text(encoding='utf-8')
+        else:
+            index_content = self.generate_index_prisma(index_path)
+            if not precompile:
+                # Un precompilado de una versión anterior ya no corresponde
+                (output_path / "index.py").unlink(missing_ok=True)
+                (output_path / "index.pyc").unlink(missing_ok=True)
+        compiled_files = 0
+        if precompile:
+            compiled_files = self.generate_compiled_python(output_path, index_content)
         functions_doc = self.generate_functions_json(output_path / "functions.json")
-        opn_metadata = self.generate_opn_metadata(output_path / f"{metadata.get('name', 'package')}.opn", metadata)
+        opn_metadata = self.generate_opn_metadata(opn_path, metadata)
+        manifest = self.save_manifest(output_path, metadata)
         
+        return self._result(output_path, manifest, files_changed=files_changed, files_generated=3 + compiled_files)
+
+    def generate_compiled_python(self, output_path: Path, index_content: str) -> int:
+        """Escribe index.py (el paquete ya transpilado) e index.pyc.
+
+        Así ``PackageLoader.load_compiled`` carga el bytecode en lugar de
+        transpilar el paquete en cada importación. La primera línea de index.py
+        identifica el transpilador y el index.prisma del que sale. Devuelve el
+        número de archivos escritos (0 si ya estaban al día o si el paquete no
+        se pudo transpilar o compilar).
+        """
+        python_file = output_path / "index.py"
+        bytecode_file = output_path / "index.pyc"
+        stamp = source_stamp(index_content)
+        try:
+            with python_file.open('rb') as handle:
+                if handle.readline().decode('utf-8').rstrip('\n') == stamp and bytecode_file.exists():
+                    return 0  # Ya corresponde a este index.prisma
+        except (OSError, UnicodeDecodeError):
+            pass
+        try:
+            body = transpile(index_content, source_file=str(output_path / "index.prisma"), runtime="import")
+            python_code = f"{stamp}\n{body}"
+            # OPN válido puede dar Python inválido (p. ej. un parámetro llamado 'from')
+            code = compile(python_code, str(python_file), "exec")
+        except (TranspilerError, SyntaxError, ValueError) as e:
+            print(f"Warning: Could not precompile {output_path / 'index.prisma'}: {e}")
+            python_file.unlink(missing_ok=True)
+            bytecode_file.unlink(missing_ok=True)
+            return 0
+        
+        # En binario para que el hash del .pyc coincida con los bytes del .py en cualquier SO
+        python_file.write_bytes(python_code.encode('utf-8'))
+        write_bytecode(bytecode_file, python_code, code)
+        return 2
+
+    def load_manifest(self, output_path: Path) -> Optional[Dict]:
+        manifest_path = output_path / self.MANIFEST_NAME
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format") != self.MANIFEST_FORMAT:
+            return None
+        return manifest
+
+    def save_manifest(self, output_path: Path, metadata: Dict) -> Dict:
+        files = {}
+        offset = 0
+        chunks = {file_path: (chunk, functions) for file_path, chunk, functions in self.file_chunks}
+        for file_path in self.source_files:
+            entry = self.file_stats.get(self._relative_key(file_path))
+            if entry is None:
+                continue
+            entry = dict(entry)
+            chunk, functions = chunks.get(file_path, (None, []))
+            entry["functions"] = functions
+            if chunk is not None:
+                entry["chunk"] = [offset, len(chunk)]
+                offset += len(chunk) + 1  # '\n' que separa los fragmentos
+            files[self._relative_key(file_path)] = entry
+
+        index_path = output_path / "index.prisma"
+        manifest = {
+            "format": self.MANIFEST_FORMAT,
+            "generatedAt": datetime.now().isoformat(),
+            "metadata": metadata,
+            "compiledWith": transpiler_fingerprint(),
+            "index": {
+                "codeOffset": self.index_code_offset,
+                "sha256": hashlib.sha256(index_path.read_bytes()).hexdigest(),
+            },
+            "files": files,
+        }
+        # Sin sangría: json solo usa su codificador en C con el formato compacto.
+        (output_path / self.MANIFEST_NAME).write_text(
+            json.dumps(manifest, ensure_ascii=False, separators=(',', ':')),
+            encoding='utf-8'
+        )
+        return manifest
+
+    def _is_up_to_date(self, manifest: Dict) -> bool:
+        """Comprueba solo con ``stat`` que el conjunto de archivos y sus mtimes coinciden."""
+        files = manifest.get("files", {})
+        if len(files) != len(self.source_files):
+            return False
+        for file_path in self.source_files:
+            previous = files.get(self._relative_key(file_path))
+            current = self._stat_entry(file_path)
+            if previous is None or current is None:
+                return False
+            if previous["mtime"] != current["mtime"] or previous["size"] != current["size"]:
+                return False
+        return True
+
+    def _collect_chunks(self, previous_code: Optional[str], manifest: Optional[Dict]) -> int:
+        """Rellena ``file_chunks``/``functions``/``all_code`` reutilizando los
+        fragmentos de index.prisma de los archivos que no cambiaron.
+
+        Los archivos modificados se leen y procesan en paralelo si ``jobs > 1``;
+        los resultados se combinan siempre en el orden de ``source_files``.
+        Devuelve el número de archivos que hubo que volver a procesar.
+        """
+        previous_files = manifest.get("files", {}) if previous_code is not None else {}
+
+        stats = {}
+        pending = []
+        for file_path in self.source_files:
+            key = self._relative_key(file_path)
+            previous = previous_files.get(key)
+            current = self._stat_entry(file_path)
+            if current is None:
+                continue
+            if previous is not None and previous["mtime"] == current["mtime"] and previous["size"] == current["size"]:
+                current["sha256"] = previous["sha256"]
+            else:
+                pending.append(file_path)
+            stats[file_path] = current
+        processed = dict(zip(pending, self._process_files(pending)))
+
+        self.file_chunks = []
+        self.file_stats = {}
+        changed = 0
+        for file_path, current in stats.items():
+            key = self._relative_key(file_path)
+            previous = previous_files.get(key)
+            result = processed.get(file_path)
+            if result is not None:
+                if result["error"] is not None:
+                    print(f"Warning: Could not read {file_path}: {result['error']}")
+                    continue
+                current["sha256"] = result["sha256"]
+                if previous is None or previous.get("sha256") != result["sha256"]:
+                    changed += 1
+                    self.file_stats[key] = current
+                    if result["chunk"] is not None:
+                        self.file_chunks.append((file_path, result["chunk"], result["functions"]))
+                    continue
+            self.file_stats[key] = current
+            chunk_span = previous.get("chunk")
+            if chunk_span is not None:
+                start, length = chunk_span
+                self.file_chunks.append((file_path, previous_code[start:start + length], previous["functions"]))
+
+        self.all_code = '\n'.join(chunk for _, chunk, _ in self.file_chunks)
+        self.functions = [func for _, _, functions in self.file_chunks for func in functions]
+        return changed
+
+    def _process_files(self, files: List[Path]) -> List[Dict]:
+        if self.jobs <= 1 or len(files) < 2:
+            return [_process_source_file(file_path) for file_path in files]
+        workers = min(self.jobs, len(files))
+        chunksize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_process_source_file, files, chunksize=chunksize))
+
+    def _previous_index_code(self, output_path: Path, manifest: Optional[Dict]) -> Optional[str]:
+        """Código consolidado del index.prisma anterior, si sigue intacto."""
+        if manifest is None:
+            return None
+        index_path = output_path / "index.prisma"
+        try:
+            data = index_path.read_bytes()
+        except OSError:
+            return None
+        index = manifest.get("index", {})
+        if hashlib.sha256(data).hexdigest() != index.get("sha256"):
+            return None
+        # Mismo tratamiento de saltos de línea que read_text()
+        content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        return content[index.get("codeOffset", 0):]
+
+    @staticmethod
+    def _stat_entry(file_path: Path) -> Optional[Dict]:
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        return {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+    def _relative_key(self, file_path: Path) -> str:
+        return file_path.relative_to(self.project_path).as_posix()
+
+    def _result(self, output_path: Path, manifest: Dict, files_changed: int, files_generated: int) -> Dict:
+        files = manifest.get("files", {})
         return {
             "success": True,
             "project_path": str(self.project_path),
             "output_path": str(output_path),
             "source_files": len(self.source_files),
-            "functions": len(self.functions),
-            "files_generated": 3,
+            "functions": sum(len(entry.get("functions", [])) for entry in files.values()),
+            "files_changed": files_changed,
+            "files_generated": files_generated,
             "timestamp": datetime.now().isoformat()
         }
 
@@ -215,9 +506,12 @@ def compile_project(
     name: str,
     version: str = "1.0.0",
     description: str = "",
-    author: str = ""
+    author: str = "",
+    incremental: bool = True,
+    jobs: int = 1,
+    precompile: bool = False
 ) -> Dict:
-    compiler = ProjectCompiler(project_path)
+    compiler = ProjectCompiler(project_path, jobs=jobs)
     
     metadata = {
         "name": name,
@@ -226,7 +520,7 @@ def compile_project(
         "author": author
     }
     
-    return compiler.compile_project(output_dir, metadata)
+    return compiler.compile_project(output_dir, metadata, incremental=incremental, precompile=precompile)
 
 
 def quick_compile(
@@ -247,7 +541,8 @@ def quick_compile(
         name=package_name,
         version=version,
         description=f"Auto-compiled package: {package_name}",
-        author="OPN Build System"
+        author="OPN Build System",
+        precompile=True
     )
     
     config = ConfigManager()
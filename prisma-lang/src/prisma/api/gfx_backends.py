@@ -0,0 +1,532 @@
+"""Backends de dibujo para ``pygfx_api``.
+
+``pygfx_api`` traduce las llamadas ``gfx.*`` (nombres de color, contadores,
+inicialización perezosa) y delega el dibujo en un backend:
+
+* ``TkBackend``: ventana de Tkinter con un ``Canvas`` y una capa ``PhotoImage``.
+* ``NullBackend``: no dibuja nada; para servidores sin display.
+* ``RecordingBackend``: guarda cada llamada en ``commands``; útil en pruebas.
+* ``RasterBackend``: framebuffer RGB en memoria (un ``bytearray``) que puede
+  escribir cada fotograma como PPM o PNG, sin display ni dependencias.
+
+Los colores llegan siempre como ``"#rrggbb"``. ``pygfx_api`` no llama a
+``draw_point``/``draw_circle`` una a una: encola una lista de visualización y
+la entrega con ``draw_batch`` en cada ``update_screen``. Sus comandos son:
+
+* ``(POINTS, y, x0, x1, color)``: puntos contiguos de la fila ``y``, de ``x0`` a ``x1``.
+* ``(CIRCLE, x, y, radius, color)``: un círculo relleno.
+* ``(POINT_SET, xs, ys, color)``: puntos sueltos de un color (``gfx.draw_points``).
+* ``(RECT, x, y, width, height, color)``: rectángulo relleno (``gfx.fill_rect``).
+* ``(CIRCLES, [(x, y, radius, color), ...])``: varios círculos (``gfx.draw_circles``).
+* ``(BLIT, data, width, height, x, y)``: imagen RGB de 3 bytes por píxel (``gfx.blit``).
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import sys
+import zlib
+from functools import lru_cache
+from math import isqrt
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+DEFAULT_BACKGROUND = "#2c3e50"
+
+# Tipos de comando de la lista de visualización
+POINTS = "points"
+CIRCLE = "circle"
+POINT_SET = "point_set"
+RECT = "rect"
+CIRCLES = "circles"
+BLIT = "blit"
+
+# Canal de depuración: los mensajes informativos ("[GFX TK] ...") solo se
+# muestran con gfx.set_debug(True) o con la variable de entorno OPN_GFX_DEBUG=1.
+DEBUG = os.environ.get("OPN_GFX_DEBUG", "") not in ("", "0")
+
+
+def debug(message: str) -> None:
+    if DEBUG:
+        print(message, file=sys.stderr)
+
+
+class BackendUnavailable(RuntimeError):
+    """El backend no puede usarse en este entorno (sin tkinter, sin display...)."""
+
+
+class GfxBackend:
+    name = "base"
+
+    def open(self, width: int, height: int, title: str) -> None:
+        raise NotImplementedError
+
+    def draw_point(self, x: int, y: int, color: str) -> None:
+        raise NotImplementedError
+
+    def draw_circle(self, x: int, y: int, radius: int, color: str) -> None:
+        raise NotImplementedError
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: str) -> None:
+        raise NotImplementedError
+
+    def blit(self, data: bytes, width: int, height: int, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def draw_batch(self, commands) -> None:
+        """Dibuja una lista de visualización; por defecto, llamada a llamada."""
+        for command in commands:
+            kind = command[0]
+            if kind == POINTS:
+                _, y, x0, x1, color = command
+                for x in range(x0, x1 + 1):
+                    self.draw_point(x, y, color)
+            elif kind == CIRCLE:
+                _, x, y, radius, color = command
+                self.draw_circle(x, y, radius, color)
+            elif kind == POINT_SET:
+                _, xs, ys, color = command
+                for x, y in zip(xs, ys):
+                    self.draw_point(x, y, color)
+            elif kind == RECT:
+                self.fill_rect(*command[1:])
+            elif kind == CIRCLES:
+                for x, y, radius, color in command[1]:
+                    self.draw_circle(x, y, radius, color)
+            elif kind == BLIT:
+                self.blit(*command[1:])
+
+    def clear(self) -> None:
+        """Borra todo lo dibujado."""
+
+    def begin_frame(self) -> None:
+        """Empieza un fotograma nuevo que sustituye al anterior en el próximo ``present``."""
+        self.clear()
+
+    def present(self) -> None:
+        """Muestra (o guarda) el fotograma actual; lo llama ``update_screen``."""
+
+    def mainloop(self) -> None:
+        """Bloquea hasta que el usuario cierre la ventana, si la hay."""
+
+    def close(self) -> None:
+        """Libera los recursos del backend."""
+
+
+class TkBackend(GfxBackend):
+    """Ventana de Tkinter; todo se dibuja en una capa ``PhotoImage`` del canvas.
+
+    Puntos, rectángulos, círculos y blits se escriben en la misma imagen, en
+    el orden de las llamadas, como en ``RasterBackend``: lo que se dibuja
+    después queda encima. Los círculos se rasterizan por filas, igual que en
+    ``RasterBackend``, en lugar de crear un óvalo del canvas por llamada.
+    """
+
+    name = "tk"
+
+    def __init__(self) -> None:
+        try:
+            import tkinter
+        except ImportError as e:
+            raise BackendUnavailable(f"tkinter no disponible ({e})") from e
+        self.tk = tkinter
+        try:
+            self.root = tkinter.Tk()
+        except tkinter.TclError as e:
+            raise BackendUnavailable(f"No se pudo abrir una ventana ({e})") from e
+        self.root.withdraw()  # Ocultar la ventana hasta que se configure el canvas
+        self.canvas = None
+        self.layer = None  # PhotoImage transparente donde se dibuja todo
+        self.width = 0
+        self.height = 0
+        debug("[GFX TK] Tkinter Initialized.")
+
+    def open(self, width: int, height: int, title: str) -> None:
+        self.root.deiconify()  # Mostrar la ventana
+        self.root.title(title)
+        if self.canvas is None:
+            self.canvas = self.tk.Canvas(self.root, width=width, height=height, bg=DEFAULT_BACKGROUND)
+            self.canvas.pack()
+        else:
+            self.canvas.config(width=width, height=height)
+        self.width = width
+        self.height = height
+        if self.layer is None:
+            self.layer = self.tk.PhotoImage(width=width, height=height)
+            self.canvas.create_image(0, 0, image=self.layer, anchor="nw", tags="points")
+        else:
+            self.layer.configure(width=width, height=height)
+        debug(f"[GFX TK] Canvas inicializado: {title} ({width}x{height})")
+
+    def draw_point(self, x: int, y: int, color: str) -> None:
+        self.draw_batch([[POINTS, y, x, x, color]])
+
+    def draw_circle(self, x: int, y: int, radius: int, color: str) -> None:
+        self.draw_batch([(CIRCLE, x, y, radius, color)])
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: str) -> None:
+        self.draw_batch([(RECT, x, y, width, height, color)])
+
+    def blit(self, data: bytes, width: int, height: int, x: int, y: int) -> None:
+        self.draw_batch([(BLIT, data, width, height, x, y)])
+
+    def draw_batch(self, commands) -> None:
+        """Escribe la lista de visualización en la capa con un único script de Tcl.
+
+        Cada comando se traduce a líneas ``put``/``copy`` de la imagen, en
+        orden, así que cruzar de Python a Tcl cuesta una llamada por lista y
+        no una por punto. Las filas de puntos consecutivas con el mismo tramo
+        y color se funden en un rectángulo: un relleno de 500x500 píxeles es
+        una sola línea del script.
+        """
+        script: List[str] = []
+        images = []  # PhotoImage temporales de los blits, vivas hasta evaluar el script
+        pending = None  # [x0, y0, x1, y1, color] aún sin escribir
+        for command in commands:
+            kind = command[0]
+            if kind == POINTS:
+                _, y, x0, x1, color = command
+                if (
+                    pending is not None and pending[3] + 1 == y and pending[0] == x0
+                    and pending[2] == x1 and pending[4] == color
+                ):
+                    pending[3] = y
+                    continue
+                if pending is not None:
+                    self._put_points(script, *pending)
+                pending = [x0, y, x1, y, color]
+                continue
+            # Cualquier otro comando va encima de los puntos pendientes
+            if pending is not None:
+                self._put_points(script, *pending)
+                pending = None
+            if kind == CIRCLE:
+                self._put_circle(script, *command[1:])
+            elif kind == CIRCLES:
+                for x, y, radius, color in command[1]:
+                    self._put_circle(script, x, y, radius, color)
+            elif kind == POINT_SET:
+                _, xs, ys, color = command
+                for x, y in zip(xs, ys):
+                    self._put_points(script, x, y, x, y, color)
+            elif kind == RECT:
+                _, x, y, width, height, color = command
+                self._put_rect(script, x, y, x + width, y + height, color)
+            elif kind == BLIT:
+                self._copy_image(script, images, *command[1:])
+        if pending is not None:
+            self._put_points(script, *pending)
+        if script:
+            self.root.tk.eval("\n".join(script))
+
+    def clear(self) -> None:
+        # begin_frame() también pasa por aquí: la ventana no se redibuja hasta present()
+        if self.layer is not None:
+            self.layer.blank()
+
+    def _put_points(self, script: List[str], x0: int, y0: int, x1: int, y1: int, color: str) -> None:
+        # Cada punto ocupa 3x3 píxeles, como el óvalo de draw_point original
+        self._put_rect(script, x0 - 1, y0 - 1, x1 + 2, y1 + 2, color)
+
+    def _put_circle(self, script: List[str], x: int, y: int, radius: int, color: str) -> None:
+        """Círculo relleno por filas, con los mismos píxeles que ``RasterBackend``.
+
+        Las filas consecutivas de igual anchura se escriben como un solo rectángulo.
+        """
+        x, y, radius = int(x), int(y), int(radius)
+        if radius < 0:
+            return
+        squared = radius * radius
+        top, half = -radius, 0
+        for dy in range(-radius, radius + 2):
+            current = isqrt(squared - dy * dy) if dy <= radius else -1
+            if dy == -radius:
+                half = current
+            elif current != half:
+                self._put_rect(script, x - half, y + top, x + half + 1, y + dy, color)
+                top, half = dy, current
+
+    def _put_rect(self, script: List[str], left: int, top: int, right: int, bottom: int, color: str) -> None:
+        # '-to' excluye el extremo derecho e inferior
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, self.width), min(bottom, self.height)
+        if left < right and top < bottom:
+            script.append(f"{self.layer} put {color} -to {left} {top} {right} {bottom}")
+
+    def _copy_image(
+        self, script: List[str], images: list, data: bytes, width: int, height: int, x: int, y: int
+    ) -> None:
+        # '-to' no admite coordenadas negativas: lo que queda fuera se recorta con '-from'
+        from_x, from_y = max(-x, 0), max(-y, 0)
+        if from_x >= width or from_y >= height:
+            return
+        png = encode_png(width, height, data, level=0)  # Sin comprimir: solo cruza a Tcl
+        image = self.tk.PhotoImage(width=width, height=height, data=png, format="png")
+        images.append(image)
+        script.append(f"{self.layer} copy {image} -from {from_x} {from_y} -to {max(x, 0)} {max(y, 0)}")
+
+    def present(self) -> None:
+        self.root.update()
+        debug("[GFX TK] Pantalla actualizada.")
+
+    def mainloop(self) -> None:
+        debug("[GFX TK] Iniciando bucle de eventos de Tkinter...")
+        self.root.mainloop()
+
+    def close(self) -> None:
+        try:
+            self.root.destroy()
+        except self.tk.TclError:
+            pass  # La ventana ya fue destruida
+
+
+class NullBackend(GfxBackend):
+    name = "null"
+
+    def open(self, width: int, height: int, title: str) -> None:
+        debug(f"[GFX] Canvas headless: {title} ({width}x{height})")
+
+    def draw_point(self, x: int, y: int, color: str) -> None:
+        pass
+
+    def draw_circle(self, x: int, y: int, radius: int, color: str) -> None:
+        pass
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: str) -> None:
+        pass
+
+    def blit(self, data: bytes, width: int, height: int, x: int, y: int) -> None:
+        pass
+
+    def draw_batch(self, commands) -> None:
+        pass
+
+
+class RecordingBackend(NullBackend):
+    name = "record"
+
+    def __init__(self) -> None:
+        self.commands: List[Tuple] = []
+
+    def open(self, width: int, height: int, title: str) -> None:
+        self.commands.append(("open", width, height, title))
+
+    def draw_point(self, x: int, y: int, color: str) -> None:
+        self.commands.append(("point", x, y, color))
+
+    def draw_circle(self, x: int, y: int, radius: int, color: str) -> None:
+        self.commands.append(("circle", x, y, radius, color))
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: str) -> None:
+        self.commands.append(("rect", x, y, width, height, color))
+
+    def blit(self, data: bytes, width: int, height: int, x: int, y: int) -> None:
+        self.commands.append(("blit", width, height, x, y))
+
+    def clear(self) -> None:
+        self.commands.append(("clear",))
+
+    def begin_frame(self) -> None:
+        self.commands.append(("begin_frame",))
+
+    # Graba cada punto por separado, como si no hubiera lista de visualización
+    draw_batch = GfxBackend.draw_batch
+
+    def present(self) -> None:
+        self.commands.append(("present",))
+
+
+@lru_cache(maxsize=256)
+def hex_to_rgb(color: str) -> bytes:
+    """``"#rrggbb"`` a 3 bytes; cualquier otro valor se dibuja en blanco."""
+    try:
+        if len(color) == 7 and color[0] == "#":
+            return bytes.fromhex(color[1:])
+    except (TypeError, ValueError):
+        pass
+    return b"\xff\xff\xff"
+
+
+def encode_png(width: int, height: int, pixels: bytes, level: int = 1) -> bytes:
+    """PNG RGB de 8 bits sin filtros; ``level`` bajo prima la velocidad."""
+    stride = width * 3
+    raw = b"".join(b"\x00" + pixels[row * stride:(row + 1) * stride] for row in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw, level)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def encode_ppm(width: int, height: int, pixels: bytes) -> bytes:
+    return b"P6\n%d %d\n255\n" % (width, height) + bytes(pixels)
+
+
+class RasterBackend(GfxBackend):
+    """Framebuffer RGB en un ``bytearray``, con rellenos por líneas horizontales.
+
+    Cada línea de un círculo se escribe con una sola asignación de slice, así
+    que el coste es proporcional al número de filas y no de píxeles. Con
+    ``output_dir``, cada ``present()`` guarda el fotograma como
+    ``frame_00001.png`` (o ``.ppm``, más rápido y sin comprimir).
+    """
+
+    name = "raster"
+
+    def __init__(
+        self, output_dir: Optional[str] = None, image_format: str = "png", background: str = DEFAULT_BACKGROUND
+    ) -> None:
+        if image_format not in ("png", "ppm"):
+            raise ValueError(f"Formato de imagen no soportado: {image_format}")
+        self.output_dir = Path(output_dir) if output_dir is not None else None
+        self.image_format = image_format
+        self.background = hex_to_rgb(background)
+        self.width = 0
+        self.height = 0
+        self.title = ""
+        self.blank = b""
+        self.pixels = bytearray()
+        self.frame = 0
+
+    def open(self, width: int, height: int, title: str) -> None:
+        self.width = width
+        self.height = height
+        self.title = title
+        self.blank = self.background * (width * height)
+        self.pixels = bytearray(self.blank)
+        if self.output_dir is not None:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+        debug(f"[GFX RASTER] Canvas inicializado: {title} ({width}x{height})")
+
+    def _span(self, y: int, x0: int, x1: int, rgb: bytes) -> None:
+        """Rellena la fila ``y`` de ``x0`` a ``x1`` (incluidos), recortando al canvas."""
+        if y < 0 or y >= self.height:
+            return
+        if x0 < 0:
+            x0 = 0
+        if x1 >= self.width:
+            x1 = self.width - 1
+        if x0 > x1:
+            return
+        start = (y * self.width + x0) * 3
+        self.pixels[start:start + (x1 - x0 + 1) * 3] = rgb * (x1 - x0 + 1)
+
+    def draw_point(self, x: int, y: int, color: str) -> None:
+        # Cada punto ocupa 3x3 píxeles, como en TkBackend
+        x, y = int(x), int(y)
+        rgb = hex_to_rgb(color)
+        for row in (y - 1, y, y + 1):
+            self._span(row, x - 1, x + 1, rgb)
+
+    def draw_batch(self, commands) -> None:
+        span = self._span
+        for command in commands:
+            kind = command[0]
+            if kind == POINTS:
+                _, y, x0, x1, color = command
+                rgb = hex_to_rgb(color)
+                for row in (y - 1, y, y + 1):
+                    span(row, x0 - 1, x1 + 1, rgb)
+            elif kind == CIRCLE:
+                _, x, y, radius, color = command
+                self.draw_circle(x, y, radius, color)
+            elif kind == POINT_SET:
+                _, xs, ys, color = command
+                rgb = hex_to_rgb(color)
+                for x, y in zip(xs, ys):
+                    span(y - 1, x - 1, x + 1, rgb)
+                    span(y, x - 1, x + 1, rgb)
+                    span(y + 1, x - 1, x + 1, rgb)
+            elif kind == RECT:
+                self.fill_rect(*command[1:])
+            elif kind == CIRCLES:
+                for x, y, radius, color in command[1]:
+                    self.draw_circle(x, y, radius, color)
+            elif kind == BLIT:
+                self.blit(*command[1:])
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: str) -> None:
+        rgb = hex_to_rgb(color)
+        for row in range(max(y, 0), min(y + height, self.height)):
+            self._span(row, x, x + width - 1, rgb)
+
+    def blit(self, data: bytes, width: int, height: int, x: int, y: int) -> None:
+        """Copia una imagen RGB fila a fila, recortada al canvas."""
+        left, right = max(-x, 0), min(width, self.width - x)
+        if left >= right:
+            return
+        count = (right - left) * 3
+        for row in range(max(-y, 0), min(height, self.height - y)):
+            source = (row * width + left) * 3
+            target = ((y + row) * self.width + x + left) * 3
+            self.pixels[target:target + count] = data[source:source + count]
+
+    def draw_circle(self, x: int, y: int, radius: int, color: str) -> None:
+        x, y, radius = int(x), int(y), int(radius)
+        if radius < 0:
+            return
+        rgb = hex_to_rgb(color)
+        squared = radius * radius
+        for dy in range(max(-radius, -y), min(radius, self.height - 1 - y) + 1):
+            half = isqrt(squared - dy * dy)
+            self._span(y + dy, x - half, x + half, rgb)
+
+    def clear(self) -> None:
+        self.pixels[:] = self.blank
+
+    def present(self) -> None:
+        self.frame += 1
+        if self.output_dir is not None:
+            self.save(self.output_dir / f"frame_{self.frame:05d}.{self.image_format}")
+
+    def save(self, path) -> None:
+        """Guarda el framebuffer como PNG o PPM según la extensión de ``path``."""
+        path = Path(path)
+        if path.suffix.lower() == ".ppm":
+            data = encode_ppm(self.width, self.height, self.pixels)
+        else:
+            data = encode_png(self.width, self.height, self.pixels)
+        path.write_bytes(data)
+
+
+BACKENDS = {
+    "tk": TkBackend,
+    "null": NullBackend,
+    "record": RecordingBackend,
+    "raster": RasterBackend,
+}
+
+
+def create_backend(name: str, **options) -> GfxBackend:
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend gráfico desconocido: {name} (disponibles: {', '.join(BACKENDS)})") from None
+    return backend_class(**options)
+
+
+__all__ = [
+    "BACKENDS",
+    "BLIT",
+    "CIRCLE",
+    "CIRCLES",
+    "POINTS",
+    "POINT_SET",
+    "RECT",
+    "BackendUnavailable",
+    "GfxBackend",
+    "NullBackend",
+    "RasterBackend",
+    "RecordingBackend",
+    "TkBackend",
+    "create_backend",
+    "encode_png",
+    "encode_ppm",
+    "hex_to_rgb",
+]
@@ -1,90 +1,383 @@
-import tkinter as tk
 import random
+import sys
+import time
+from collections import deque
 
-# --- Variables de estado global para la API de Tkinter ---
-_ROOT = None
-_SCREEN = None
-_RUNNING = False
+from ..config.colors import GFX_PALETTE
+from . import gfx_backends
+from .gfx_backends import (
+    BLIT,
+    CIRCLE,
+    CIRCLES,
+    POINT_SET,
+    POINTS,
+    RECT,
+    BackendUnavailable,
+    GfxBackend,
+    NullBackend,
+    create_backend,
+)
+
+# --- Variables de estado global de la API gráfica ---
+# El backend (Tk por defecto) se crea en init(), la primera vez que un script
+# abre un canvas: los scripts que no dibujan no cargan tkinter.
+_BACKEND = None
+_BACKEND_SPEC = ("tk", {})
+_CANVAS_OPEN = False
 _TITLE = ""
 _DRAW_CALL_COUNT = 0
 _UPDATE_COUNT = 0
 
+# Lista de visualización: las llamadas de dibujo se encolan y llegan al backend
+# de una vez en update_screen(). Los puntos contiguos de una misma fila y color
+# se funden al encolarlos, así que un relleno punto a punto ocupa un comando
+# por fila. Si la cola llega a MAX_PENDING_COMMANDS se vacía antes de tiempo.
+_DISPLAY_LIST = []
+MAX_PENDING_COMMANDS = 16384
+
+# Últimos tiempos de fotograma guardados para los percentiles de frame_stats()
+MAX_FRAME_SAMPLES = 10000
+
+
+def _sleep_until(deadline: float):
+    """Duerme hasta ``deadline`` (reloj perf_counter) con precisión de sub-milisegundo.
+
+    ``time.sleep`` puede pasarse de largo en un tick del planificador, así que
+    se duerme hasta ~1 ms antes y el resto se espera activamente.
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > 0.002:
+            time.sleep(remaining - 0.001)
+
+
+class FrameScheduler:
+    """Ritmo de update_screen() con set_target_fps() y estadísticas de fotogramas.
+
+    Cada fotograma tiene una fecha límite, la anterior más ``1/fps``. Si se
+    llega antes, se espera; si se llega con más de un fotograma de retraso,
+    el fotograma no se presenta (se cuenta como descartado) y el reloj se
+    recoloca, para no acumular retraso. Nunca se descartan dos seguidos, así
+    que la ventana se sigue refrescando aunque el script no alcance el ritmo.
+    """
+
+    def __init__(self, fps: float = 0):
+        self.interval = 0.0
+        self.deadline = None
+        self.last = None
+        self.frame_times = deque(maxlen=MAX_FRAME_SAMPLES)
+        self.presented = 0
+        self.dropped = 0
+        self.last_dropped = False
+        self.set_fps(fps)
+
+    def set_fps(self, fps: float):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.deadline = None
+
+    def wait(self) -> bool:
+        """Espera al siguiente fotograma; devuelve False si hay que saltarse este."""
+        if self.interval:
+            now = time.perf_counter()
+            self.deadline = now if self.deadline is None else self.deadline + self.interval
+            if now - self.deadline > self.interval:
+                self.deadline = now
+                if not self.last_dropped:
+                    self.dropped += 1
+                    self.last_dropped = True
+                    self._tick()
+                    return False
+            _sleep_until(self.deadline)
+        self.last_dropped = False
+        self.presented += 1
+        self._tick()
+        return True
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.frame_times.append(now - self.last)
+        self.last = now
+
+    def stats(self) -> dict:
+        times = sorted(self.frame_times)
+
+        def percentile(fraction: float) -> float:
+            return times[min(len(times) - 1, int(fraction * len(times)))] * 1000 if times else 0.0
+
+        return {
+            "frames": self.presented + self.dropped,
+            "presented": self.presented,
+            "dropped": self.dropped,
+            "target_fps": 1.0 / self.interval if self.interval else 0.0,
+            "fps": len(times) / sum(times) if times and sum(times) > 0 else 0.0,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
+
+
+_SCHEDULER = FrameScheduler()
+
+def set_target_fps(fps: float):
+    """Limita update_screen() a ``fps`` fotogramas por segundo (0 = sin límite)."""
+    _SCHEDULER.set_fps(fps)
+
+def frame_stats() -> dict:
+    """Fotogramas presentados y descartados, fps medio y tiempos p50/p99 en ms."""
+    return _SCHEDULER.stats()
+
+def set_debug(enabled: bool = True):
+    """Muestra los mensajes informativos de gfx en stderr (también con OPN_GFX_DEBUG=1)."""
+    gfx_backends.DEBUG = enabled
+
+def set_backend(backend="tk", **options):
+    """Elige el backend de dibujo: un ``GfxBackend`` o su nombre (tk, null, record, raster).
+
+    Con un nombre, el backend se crea en ``init()``; las opciones se pasan a
+    su constructor (p. ej. ``set_backend("raster", output_dir="frames")``).
+    """
+    global _BACKEND, _BACKEND_SPEC
+    if isinstance(backend, GfxBackend):
+        _BACKEND = backend
+    else:
+        _BACKEND_SPEC = (backend, options)
+
+def set_headless(enabled: bool = True):
+    """Activa el modo sin ventana: no se importa tkinter y las llamadas de dibujo solo se cuentan."""
+    set_backend("null" if enabled else "tk")
+
 def init():
-    """Inicializa la ventana raíz de Tkinter si no existe."""
-    global _ROOT, _RUNNING
-    if _ROOT is None:
-        _ROOT = tk.Tk()
-        _ROOT.withdraw()  # Ocultar la ventana hasta que se configure el canvas
-        _RUNNING = True
-        print("[GFX TK] Tkinter Initialized.")
+    """Crea el backend de dibujo si no existe.
+
+    Si tkinter no está instalado o no hay display (un servidor sin X), se
+    pasa al modo headless en lugar de fallar.
+    """
+    global _BACKEND
+    if _BACKEND is not None:
+        return
+    name, options = _BACKEND_SPEC
+    try:
+        _BACKEND = create_backend(name, **options)
+    except BackendUnavailable as e:
+        print(f"[GFX] {e}; modo headless.", file=sys.stderr)  # stdout es del programa
+        _BACKEND = NullBackend()
 
 def quit():
-    """Destruye la ventana de Tkinter si existe."""
-    global _ROOT, _RUNNING, _DRAW_CALL_COUNT, _UPDATE_COUNT
-    if _ROOT:
+    """Cierra el backend (y su ventana, si la hay)."""
+    global _BACKEND, _CANVAS_OPEN, _DRAW_CALL_COUNT, _UPDATE_COUNT, _SCHEDULER
+    if _BACKEND is not None:
         # Report GFX stats before quitting
         print("\n--- GFX Stats ---")
         print(f"Total Draw Calls: {_DRAW_CALL_COUNT}")
         print(f"Total Screen Updates: {_UPDATE_COUNT}")
+        stats = _SCHEDULER.stats()
+        if stats["frames"] > 1:
+            print(f"Frame Time p50/p99: {stats['p50_ms']:.2f} / {stats['p99_ms']:.2f} ms ({stats['fps']:.1f} fps)")
+            print(f"Dropped Frames: {stats['dropped']}")
         print("-----------------\n")
 
-        try:
-            _ROOT.destroy()
-        except tk.TclError:
-            pass  # La ventana ya fue destruida
-        _ROOT = None
-        _RUNNING = False
+        _DISPLAY_LIST.clear()
+        _BACKEND.close()
+        _BACKEND = None
+        _CANVAS_OPEN = False
+        _DRAW_CALL_COUNT = 0
+        _UPDATE_COUNT = 0
+        _SCHEDULER = FrameScheduler(stats["target_fps"])
 
 def setup_canvas(width: int, height: int, title: str):
     """Configura y muestra el canvas principal."""
-    global _ROOT, _SCREEN, _TITLE
-    if not _ROOT:
+    global _CANVAS_OPEN, _TITLE
+    if _BACKEND is None:
         init()
-    _ROOT.deiconify()  # Mostrar la ventana
     _TITLE = title
-    _ROOT.title(title)
-    if _SCREEN is None:
-        _SCREEN = tk.Canvas(_ROOT, width=width, height=height, bg="#2c3e50")
-        _SCREEN.pack()
-    else:
-        _SCREEN.config(width=width, height=height)
-    print(f"[GFX TK] Canvas inicializado: {title} ({width}x{height})")
-
-# Función auxiliar para convertir nombres de color a tuplas RGB
-def _get_hex_color(color_name: str) -> str:
-    """Convierte nombres de color a códigos hexadecimales para Tkinter."""
-    colors = {
-        "Rojo": "#e74c3c", "Verde": "#2ecc71", "Azul": "#3498db",
-        "Amarillo": "#f1c40f", "Púrpura": "#9b59b6", "Cian": "#1abc9c",
-        "Blanco": "#ecf0f1", "Negro": "#2c3e50"
-    }
-    return colors.get(color_name, "#ffffff") # Blanco por defecto
+    _BACKEND.open(width, height, title)
+    _CANVAS_OPEN = True
+
+# --- Registro de colores ---
+# Cualquier color ya visto (nombre, "#rrggbb", tupla RGB) se guarda en
+# _COLOR_CACHE con su "#rrggbb" normalizado e internado, así que cada llamada
+# de dibujo resuelve el color con un único acceso al dict. La paleta sale de
+# prisma/config/colors.py y se amplía con register_palette().
+DEFAULT_COLOR = "#ffffff"
+MAX_CACHED_COLORS = 4096  # Un degradado de tuplas RGB no debe hacer crecer la caché sin límite
+_PALETTE = {}       # Nombre tal cual y en minúsculas -> "#rrggbb"
+_COLOR_CACHE = {}   # Cualquier valor ya resuelto -> "#rrggbb"
+
+def _parse_color(color) -> str:
+    """Normaliza un color que no está en la caché; los desconocidos son blancos."""
+    if isinstance(color, str):
+        text = color.strip()
+        if text.startswith("#") and len(text) in (4, 7):
+            digits = text[1:] if len(text) == 7 else "".join(c * 2 for c in text[1:])
+            try:
+                int(digits, 16)
+            except ValueError:
+                return DEFAULT_COLOR
+            return sys.intern("#" + digits.lower())
+        return _PALETTE.get(text.lower(), DEFAULT_COLOR)
+    if isinstance(color, (tuple, list)) and len(color) == 3:
+        try:
+            red, green, blue = (int(channel) for channel in color)
+        except (TypeError, ValueError):
+            return DEFAULT_COLOR
+        if all(0 <= channel <= 255 for channel in (red, green, blue)):
+            return sys.intern(f"#{red:02x}{green:02x}{blue:02x}")
+    return DEFAULT_COLOR
+
+def register_palette(colors):
+    """Añade o redefine colores con nombre.
+
+    ``colors`` es una lista de pares ``[["nombre", "#rrggbb"], ["otro", [r, g, b]]]``,
+    la forma que admite OPN (no tiene literales de diccionario), o desde
+    Python un ``dict`` ``{"nombre": color}``. Los nombres no distinguen
+    mayúsculas y pueden apuntar a otros ya registrados (``["fondo", "Negro"]``).
+    Sirve para usar paletas propias sin tocar el código de gfx.
+    """
+    pairs = colors.items() if isinstance(colors, dict) else colors
+    for pair in pairs:
+        try:
+            name, value = pair
+        except (TypeError, ValueError):
+            raise ValueError(f"register_palette: se esperaba un par [nombre, color], no {pair!r}") from None
+        hex_color = _parse_color(value)
+        lowered = name.strip().lower()
+        for key in [key for key in _PALETTE if key.lower() == lowered]:
+            del _PALETTE[key]
+        _PALETTE[name] = _PALETTE[lowered] = hex_color
+    _COLOR_CACHE.clear()  # Lo resuelto antes puede haber cambiado de color
+    _COLOR_CACHE.update(_PALETTE)
+
+def _get_hex_color(color) -> str:
+    """Convierte un color (nombre, ``"#rrggbb"`` o tupla RGB) al ``"#rrggbb"`` de los backends."""
+    try:
+        return _COLOR_CACHE[color]
+    except KeyError:
+        hex_color = _parse_color(color)
+        if len(_COLOR_CACHE) < MAX_CACHED_COLORS:
+            _COLOR_CACHE[color] = hex_color
+        return hex_color
+    except TypeError:  # Una lista de OPN ([r, g, b]) no es hashable
+        return _get_hex_color(tuple(color)) if isinstance(color, list) else DEFAULT_COLOR
+
+register_palette(GFX_PALETTE)
+
+def _enqueue(command):
+    _DISPLAY_LIST.append(command)
+    if len(_DISPLAY_LIST) >= MAX_PENDING_COMMANDS:
+        flush()
+
+def flush():
+    """Envía al backend las llamadas de dibujo pendientes, sin refrescar la pantalla."""
+    if _DISPLAY_LIST and _BACKEND is not None:
+        commands = list(_DISPLAY_LIST)
+        _DISPLAY_LIST.clear()
+        _BACKEND.draw_batch(commands)
+
+def begin_frame():
+    """Empieza un fotograma nuevo.
+
+    Lo que se dibuje a partir de aquí sustituye al fotograma anterior en el
+    próximo update_screen(), sin parpadeo: el anterior sigue en pantalla
+    hasta entonces. En Tk todo se dibuja en una sola imagen que aquí se
+    vacía, así que el coste por fotograma no crece con la animación.
+    """
+    if _CANVAS_OPEN:
+        _DISPLAY_LIST.clear()  # Lo pendiente del fotograma anterior ya no se verá
+        _BACKEND.begin_frame()
+
+def clear():
+    """Borra todo lo dibujado en el canvas."""
+    if _CANVAS_OPEN:
+        _DISPLAY_LIST.clear()
+        _BACKEND.clear()
 
 def draw_point(x: int, y: int, color: str):
     """Dibuja un pequeño círculo para simular un punto."""
     global _DRAW_CALL_COUNT
-    if _SCREEN:
+    if _CANVAS_OPEN:
         _DRAW_CALL_COUNT += 1
+        x, y = int(x), int(y)
         hex_color = _get_hex_color(color)
-        _SCREEN.create_oval(x-1, y-1, x+1, y+1, fill=hex_color, outline=hex_color)
-        
+        if _DISPLAY_LIST:
+            last = _DISPLAY_LIST[-1]
+            # Extender el tramo anterior si este punto lo continúa en la misma fila
+            if last[0] == POINTS and last[1] == y and last[3] + 1 == x and last[4] == hex_color:
+                last[3] = x
+                return
+        _enqueue([POINTS, y, x, x, hex_color])
+
 def draw_circle(x: int, y: int, radius: int, color: str):
     """Dibuja un círculo relleno."""
     global _DRAW_CALL_COUNT
-    if _SCREEN:
+    if _CANVAS_OPEN:
         _DRAW_CALL_COUNT += 1
-        hex_color = _get_hex_color(color)
-        _SCREEN.create_oval(x-radius, y-radius, x+radius, y+radius, fill=hex_color, outline=hex_color)
-        
+        _enqueue((CIRCLE, x, y, radius, _get_hex_color(color)))
+
+# --- Primitivas en bloque ---
+# Cada llamada encola un solo comando, que el backend dibuja de una vez: un
+# bucle de OPN que construye listas y llama a draw_points() cruza a Python y
+# al backend una vez, no una por punto.
+
+def draw_points(xs, ys, color: str):
+    """Dibuja un punto por cada par (``xs[i]``, ``ys[i]``), todos del mismo color.
+
+    ``xs`` e ``ys`` pueden ser listas, ``range``, ``array.array`` o cualquier
+    secuencia de números de la misma longitud.
+    """
+    global _DRAW_CALL_COUNT
+    if _CANVAS_OPEN:
+        xs, ys = [int(x) for x in xs], [int(y) for y in ys]
+        if len(xs) != len(ys):
+            raise ValueError(f"draw_points: {len(xs)} coordenadas x y {len(ys)} coordenadas y")
+        _DRAW_CALL_COUNT += 1
+        _enqueue((POINT_SET, xs, ys, _get_hex_color(color)))
+
+def fill_rect(x: int, y: int, width: int, height: int, color: str):
+    """Rellena el rectángulo de ``width`` x ``height`` píxeles con esquina superior izquierda en (x, y)."""
+    global _DRAW_CALL_COUNT
+    if _CANVAS_OPEN:
+        _DRAW_CALL_COUNT += 1
+        _enqueue((RECT, int(x), int(y), int(width), int(height), _get_hex_color(color)))
+
+def draw_circles(circles, color: str = None):
+    """Dibuja varios círculos rellenos: ``[x, y, radio]`` o ``[x, y, radio, color]`` cada uno.
+
+    Los que no traen color usan ``color``.
+    """
+    global _DRAW_CALL_COUNT
+    if _CANVAS_OPEN:
+        _DRAW_CALL_COUNT += 1
+        _enqueue((CIRCLES, [
+            (circle[0], circle[1], circle[2], _get_hex_color(circle[3] if len(circle) > 3 else color))
+            for circle in circles
+        ]))
+
+def blit(buffer, width: int, height: int, x: int = 0, y: int = 0):
+    """Copia una imagen RGB (3 bytes por píxel, fila a fila) con esquina superior izquierda en (x, y).
+
+    ``buffer`` puede ser ``bytes``, ``bytearray``, ``array.array('B')``, una
+    lista de enteros 0-255 o cualquier objeto con protocolo de buffer.
+    """
+    global _DRAW_CALL_COUNT
+    if _CANVAS_OPEN:
+        data = bytes(buffer)  # Copia: el script puede modificar el buffer antes de flush()
+        if len(data) != width * height * 3:
+            raise ValueError(f"blit: se esperaban {width * height * 3} bytes para {width}x{height}, hay {len(data)}")
+        _DRAW_CALL_COUNT += 1
+        _enqueue((BLIT, data, int(width), int(height), int(x), int(y)))
+
 def update_screen():
-    """Refresca el canvas para mostrar los cambios."""
+    """Refresca el canvas para mostrar los cambios, al ritmo de set_target_fps()."""
     global _UPDATE_COUNT
-    if _ROOT:
+    if _BACKEND is not None:
         _UPDATE_COUNT += 1
-        _ROOT.update()
-        print("[GFX TK] Pantalla actualizada.")
+        flush()
+        if _SCHEDULER.wait():
+            _BACKEND.present()
 
 # Función de utilidad para OPN
 def get_random_color() -> str:
     """Devuelve un color aleatorio simple para el ejemplo."""
-    return random.choice(["Rojo", "Verde", "Azul", "Amarillo", "Púrpura", "Cian"])
\ No newline at end of file
+    return random.choice(["Rojo", "Verde", "Azul", "Amarillo", "Púrpura", "Cian"])
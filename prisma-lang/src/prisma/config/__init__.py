@@ -1,6 +1,6 @@
 from .aliases import CALL_ALIASES, TYPE_ALIASES
 from .keywords import KEYWORDS, OPERATORS, BUILTINS, GFX_FUNCTIONS, GFX_COLORS
-from .colors import SYNTAX_COLORS, THEME_COLORS
+from .colors import SYNTAX_COLORS, THEME_COLORS, GFX_PALETTE
 
 __all__ = [
     'CALL_ALIASES',
@@ -10,6 +10,7 @@ __all__ = [
     'BUILTINS',
     'GFX_FUNCTIONS',
     'GFX_COLORS',
+    'GFX_PALETTE',
     'SYNTAX_COLORS',
     'THEME_COLORS'
 ]
@@ -30,3 +30,25 @@ THEME_COLORS = {
         "cursor": "#000000",
     }
 }
+
+# Paleta de gfx: los nombres que devuelven render/colors y render/core
+# (color_red(), get_primary_red()...) y sus equivalentes en inglés. Un script
+# puede añadir o redefinir colores con gfx.register_palette().
+GFX_PALETTE = {
+    "Rojo": "#e74c3c",
+    "Verde": "#2ecc71",
+    "Azul": "#3498db",
+    "Amarillo": "#f1c40f",
+    "Púrpura": "#9b59b6",
+    "Cian": "#1abc9c",
+    "Blanco": "#ecf0f1",
+    "Negro": "#2c3e50",
+    "red": "#e74c3c",
+    "green": "#2ecc71",
+    "blue": "#3498db",
+    "yellow": "#f1c40f",
+    "purple": "#9b59b6",
+    "cyan": "#1abc9c",
+    "white": "#ecf0f1",
+    "black": "#2c3e50",
+}
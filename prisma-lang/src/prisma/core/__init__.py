@@ -1,4 +1,6 @@
-from .transpiler import TranspilerError, transpile, transpile_path, OPNTranspiler
+from .transpiler import LexerError, TranspilerError, transpile, transpile_path, OPNTranspiler
+from .cache import TranspileCache
+from .batch import transpile_many
 from .visitor import (
     Program, Class, This, Function, Parameter, Block, Statement,
     LetStatement, SetStatement, ImportStatement, ReturnStatement,
@@ -7,10 +9,13 @@ from .visitor import (
 )
 
 __all__ = [
+    "LexerError",
     "TranspilerError",
     "transpile",
     "transpile_path",
     "OPNTranspiler",
+    "TranspileCache",
+    "transpile_many",
     "Program",
     "Class",
     "This",
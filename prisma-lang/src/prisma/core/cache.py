@@ -0,0 +1,256 @@
+"""Caché en disco del transpilador, direccionada por contenido.
+
+Cada entrada vive en ``~/.opn/cache`` como dos archivos con la misma clave:
+``<clave>.py`` con el Python generado y ``<clave>.pyc`` con el objeto código
+ya compilado y serializado con ``marshal`` (precedido del número mágico del
+intérprete, igual que en ``__pycache__``). La clave es el SHA-256 del código
+fuente, la versión del transpilador y las opciones de transpilación, así que
+un acierto permite saltarse el lexer, el parser, el emisor y ``compile()``.
+
+La caché es un acelerador: cualquier error de E/S se ignora y se recurre a
+transpilar de nuevo. El tamaño total se limita expulsando primero las
+entradas usadas hace más tiempo (LRU por ``mtime``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import marshal
+import os
+from functools import lru_cache
+from pathlib import Path
+from types import CodeType
+from typing import Dict, Optional, Tuple
+
+from .transpiler import TRANSPILER_VERSION, transpile
+
+DEFAULT_CACHE_DIR = Path.home() / ".opn" / "cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Archivos cuyo contenido determina la salida del transpilador.
+_FINGERPRINT_FILES = (
+    Path(__file__).with_name("transpiler.py"),
+    Path(__file__).with_name("visitor.py"),
+    Path(__file__).resolve().parents[1] / "runtime.py",
+)
+
+
+# Bandera de .pyc basado en hash y comprobado (PEP 552).
+_CHECKED_HASH_PYC = 0b11
+
+
+@lru_cache(maxsize=None)
+def transpiler_fingerprint() -> str:
+    """Versión del transpilador más un hash de sus fuentes.
+
+    Así una instalación editable invalida la caché en cuanto cambia el
+    transpilador, aunque ``TRANSPILER_VERSION`` siga igual.
+    """
+    digest = hashlib.sha256(TRANSPILER_VERSION.encode("utf-8"))
+    for path in _FINGERPRINT_FILES:
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            continue
+    return digest.hexdigest()[:16]
+
+
+def source_stamp(source: str) -> str:
+    """Primera línea de un .py generado: identifica el transpilador y el fuente OPN.
+
+    Si cualquiera de los dos cambia, la línea deja de coincidir y el .py
+    (y su .pyc) se consideran obsoletos.
+    """
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    return f"# opn: transpiler={transpiler_fingerprint()} source-sha256={digest}"
+
+
+def write_bytecode(path: Path, python_code: str, code: CodeType) -> None:
+    """Escribe ``code`` como un .pyc basado en hash del texto ``python_code``.
+
+    Es el mismo formato que ``py_compile`` con ``CHECKED_HASH``, así que el
+    archivo también es válido para el propio intérprete. El texto puede ser
+    el Python generado o cualquier otro que identifique el fuente (por
+    ejemplo ``source_stamp``).
+    """
+    data = bytearray(importlib.util.MAGIC_NUMBER)
+    data += _CHECKED_HASH_PYC.to_bytes(4, "little")
+    data += importlib.util.source_hash(python_code.encode("utf-8"))
+    data += marshal.dumps(code)
+    _write_atomic(path, bytes(data))
+
+
+def read_bytecode(path: Path, python_code: str) -> Optional[CodeType]:
+    """Carga un .pyc de ``write_bytecode`` si corresponde a ``python_code``."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    magic = importlib.util.MAGIC_NUMBER
+    if len(data) < 16 or data[:4] != magic or int.from_bytes(data[4:8], "little") != _CHECKED_HASH_PYC:
+        return None
+    if data[8:16] != importlib.util.source_hash(python_code.encode("utf-8")):
+        return None
+    try:
+        code = marshal.loads(data[16:])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, CodeType) else None
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class TranspileCache:
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def key(self, source: str, source_file: Optional[str] = None, runtime: str = "inline", profile: bool = False) -> str:
+        suffix = Path(source_file).suffix.lower() if source_file else ""
+        digest = hashlib.sha256()
+        for part in (transpiler_fingerprint(), runtime, "profile" if profile else "", suffix):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def load(
+        self,
+        source: str,
+        source_file: Optional[str] = None,
+        runtime: str = "inline",
+        profile: bool = False,
+        filename: str = "<opn>",
+    ) -> Tuple[str, CodeType]:
+        """Devuelve ``(python_code, code_object)`` desde la caché o transpilando.
+
+        Los ``TranspilerError`` se propagan y los errores nunca se guardan.
+        """
+        key = self.key(source, source_file=source_file, runtime=runtime, profile=profile)
+        python_code = self.get(key)
+        if python_code is not None:
+            code = self.get_code(key, filename)
+            if code is None:
+                code = compile(python_code, filename, "exec")
+                self.put(key, python_code, code)
+            return python_code, code
+
+        python_code = transpile(source, source_file=source_file, runtime=runtime, profile=profile)
+        code = compile(python_code, filename, "exec")
+        self.put(key, python_code, code)
+        return python_code, code
+
+    def transpile(
+        self, source: str, source_file: Optional[str] = None, runtime: str = "inline", profile: bool = False
+    ) -> str:
+        """Como ``transpile()`` pero reutilizando la salida guardada si existe."""
+        key = self.key(source, source_file=source_file, runtime=runtime, profile=profile)
+        python_code = self.get(key)
+        if python_code is None:
+            python_code = transpile(source, source_file=source_file, runtime=runtime, profile=profile)
+            self.put(key, python_code)
+        return python_code
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.cache_dir / f"{key}.py"
+        try:
+            python_code = path.read_text(encoding="utf-8")
+            os.utime(path)  # Marcar la entrada como usada recientemente
+        except OSError:
+            return None
+        return python_code
+
+    def get_code(self, key: str, filename: str = "<opn>") -> Optional[CodeType]:
+        path = self.cache_dir / f"{key}.pyc"
+        magic = importlib.util.MAGIC_NUMBER
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if data[: len(magic)] != magic:
+            return None  # Compilado por otra versión de Python
+        try:
+            code = marshal.loads(data[len(magic):])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(code, CodeType) or code.co_filename != filename:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return code
+
+    def put(self, key: str, python_code: str, code: Optional[CodeType] = None) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self.cache_dir / f"{key}.py", python_code.encode("utf-8"))
+            if code is not None:
+                _write_atomic(self.cache_dir / f"{key}.pyc", importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+            self._evict()
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        entries = self._entries()
+        return {
+            "path": str(self.cache_dir),
+            "entries": len({path.stem for path, _, _ in entries}),
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> int:
+        removed = 0
+        for path, _, _ in self._entries():
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _entries(self):
+        entries = []
+        try:
+            iterator = os.scandir(self.cache_dir)
+        except OSError:
+            return entries
+        with iterator:
+            for entry in iterator:
+                if not entry.name.endswith((".py", ".pyc")):
+                    continue
+                try:
+                    info = entry.stat()
+                except OSError:
+                    continue
+                entries.append((Path(entry.path), info.st_size, info.st_mtime_ns))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # Las dos mitades de una entrada se expulsan juntas, la menos reciente primero.
+        by_key: Dict[str, list] = {}
+        for path, size, mtime in entries:
+            group = by_key.setdefault(path.stem, [0, 0, []])
+            group[0] = max(group[0], mtime)
+            group[1] += size
+            group[2].append(path)
+        for _, size, paths in sorted(by_key.values(), key=lambda group: group[0]):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
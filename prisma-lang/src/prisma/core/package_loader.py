@@ -1,9 +1,130 @@
 from pathlib import Path
-from typing import Optional, Tuple
+from types import CodeType
+from typing import Dict, List, Optional, Tuple
+import hashlib
 import json
+import os
 import sys
 
 
+INDEX_DIR = Path.home() / '.opn' / 'package-index'
+REGISTRY_FILE = Path.home() / '.opn' / 'config' / 'packages.json'
+INDEX_FORMAT = 'opn-package-index-v2'
+
+
+class PackageIndex:
+    """Índice persistente ``nombre -> ruta`` de los paquetes OPN.
+
+    Se construye una vez recorriendo las rutas de búsqueda y el registro de
+    ``ConfigManager`` y se guarda en ``~/.opn/package-index``. Al cargarlo solo
+    se comprueba el ``mtime`` de cada ruta de búsqueda y del registro: crear o
+    borrar un paquete cambia el del directorio que lo contiene y el índice se
+    reconstruye. Los directorios de una ruta de búsqueda que aún no tenían
+    index.prisma se recuerdan aparte y se vuelven a mirar si se piden, y un
+    acierto se confirma con un ``stat`` de su index.prisma.
+    """
+
+    def __init__(self, search_paths: List[Path], registry_file: Path = REGISTRY_FILE, index_dir: Path = INDEX_DIR):
+        self.search_paths = [Path(path) for path in search_paths]
+        self.registry_file = Path(registry_file)
+        roots_key = '\0'.join(str(path) for path in self.search_paths) + '\0' + str(self.registry_file)
+        self.index_file = Path(index_dir) / f"{hashlib.sha256(roots_key.encode('utf-8')).hexdigest()[:16]}.json"
+        self._data: Optional[Dict] = None
+
+    def lookup(self, package_name: str) -> Optional[Path]:
+        data = self._load()
+        entry = data['packages'].get(package_name)
+        if entry is not None:
+            package_dir = Path(entry['path'])
+            if (package_dir / 'index.prisma').is_file():
+                return package_dir
+            # Borrar index.prisma o un paquete registrado no cambia ningún mtime vigilado
+            entry = self.refresh()['packages'].get(package_name)
+            return Path(entry['path']) if entry is not None else None
+        if package_name in data['incomplete']:
+            # Directorio que existía sin index.prisma: puede haberse completado
+            for search_path in self.search_paths:
+                if (search_path / package_name / 'index.prisma').exists():
+                    self.refresh()
+                    return self.lookup(package_name)
+        return None
+
+    def packages(self) -> Dict[str, Dict]:
+        return dict(self._load()['packages'])
+
+    def refresh(self) -> Dict:
+        self._data = self._build()
+        self._save(self._data)
+        return self._data
+
+    def _load(self) -> Dict:
+        if self._data is not None:
+            return self._data
+        try:
+            data = json.loads(self.index_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            data = None
+        if data is not None and data.get('format') == INDEX_FORMAT and data.get('stamps') == self._stamps():
+            self._data = data
+            return data
+        return self.refresh()
+
+    def _stamps(self) -> List[Optional[int]]:
+        stamps = []
+        for path in [*self.search_paths, self.registry_file]:
+            try:
+                stamps.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return stamps
+
+    def _build(self) -> Dict:
+        stamps = self._stamps()
+        packages: Dict[str, Dict] = {}
+        incomplete: List[str] = []
+        for search_path in self.search_paths:
+            try:
+                entries = sorted(os.scandir(search_path), key=lambda entry: entry.name)
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.is_dir() or entry.name in packages:
+                    continue
+                package_dir = Path(entry.path)
+                if (package_dir / 'index.prisma').is_file():
+                    packages[entry.name] = {'path': str(package_dir)}
+                else:
+                    incomplete.append(entry.name)
+
+        for registered in self._registry():
+            name, path = registered.get('name'), registered.get('path')
+            if name and path and name not in packages and (Path(path) / 'index.prisma').is_file():
+                packages[name] = {'path': str(Path(path))}
+
+        return {
+            'format': INDEX_FORMAT,
+            'stamps': stamps,
+            'packages': packages,
+            'incomplete': sorted(set(incomplete) - set(packages)),
+        }
+
+    def _registry(self) -> List[Dict]:
+        try:
+            return json.loads(self.registry_file.read_text(encoding='utf-8')).get('packages', [])
+        except (OSError, ValueError, AttributeError):
+            return []
+
+    def _save(self, data: Dict) -> None:
+        # Importación diferida: cache importa el transpilador, que importa este módulo.
+        from .cache import _write_atomic
+
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self.index_file, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        except OSError:
+            pass
+
+
 class PackageLoader:
     def __init__(self):
         self.package_paths = [
@@ -11,23 +132,29 @@ class PackageLoader:
             Path.home() / '.opn' / 'packages'
         ]
         self.cache = {}
+        self._index: Optional[PackageIndex] = None
 
     def add_search_path(self, path: str) -> None:
         path_obj = Path(path)
         if path_obj not in self.package_paths:
             self.package_paths.insert(0, path_obj)
+            self._index = None
+            self.cache.clear()
+
+    @property
+    def index(self) -> PackageIndex:
+        if self._index is None:
+            self._index = PackageIndex(self.package_paths)
+        return self._index
 
     def find_package(self, package_name: str) -> Optional[Path]:
         if package_name in self.cache:
             return self.cache[package_name]
         
-        for search_path in self.package_paths:
-            package_dir = search_path / package_name
-            if package_dir.exists() and (package_dir / 'index.prisma').exists():
-                self.cache[package_name] = package_dir
-                return package_dir
-        
-        return None
+        package_dir = self.index.lookup(package_name)
+        if package_dir is not None:
+            self.cache[package_name] = package_dir
+        return package_dir
 
     def load_package_code(self, package_name: str) -> Optional[str]:
         package_dir = self.find_package(package_name)
@@ -40,6 +167,43 @@ class PackageLoader:
         
         return index_file.read_text(encoding='utf-8')
 
+    def load_compiled(self, package_name: str) -> Optional[Tuple[str, CodeType]]:
+        """Devuelve ``(index.py, código)`` precompilados por ``opn compile``.
+
+        Solo si siguen frescos: la cabecera de index.py debe corresponder al
+        index.prisma actual y a este transpilador, y index.pyc a ese index.py.
+        Si falta el .pyc pero el .py es válido, se compila en memoria.
+        """
+        # Importación diferida: cache importa el transpilador, que importa este módulo.
+        from .cache import read_bytecode, source_stamp
+
+        package_dir = self.find_package(package_name)
+        if not package_dir:
+            return None
+        python_file = package_dir / 'index.py'
+        try:
+            source = (package_dir / 'index.prisma').read_text(encoding='utf-8')
+            python_code = python_file.read_bytes().decode('utf-8')
+        except (OSError, UnicodeDecodeError):
+            return None
+        if python_code.split('\n', 1)[0] != source_stamp(source):
+            return None
+        code = read_bytecode(package_dir / 'index.pyc', python_code)
+        if code is None:
+            code = compile(python_code, str(python_file), 'exec')
+        return python_code, code
+
+    def load_package_python(self, package_name: str) -> Optional[str]:
+        """Código Python del paquete: el precompilado si está fresco, si no se transpila."""
+        compiled = self.load_compiled(package_name)
+        if compiled:
+            return compiled[0]
+        code = self.load_package_code(package_name)
+        if code is None:
+            return None
+        from .transpiler import transpile
+        return transpile(code, source_file=str(self.find_package(package_name) / 'index.prisma'), runtime='import')
+
     def get_package_metadata(self, package_name: str) -> Optional[dict]:
         package_dir = self.find_package(package_name)
         if not package_dir:
@@ -61,7 +225,7 @@ class PackageLoader:
         package = self.find_package(module_name)
         if package:
             is_opn_package = True
-            code = self.load_package_code(module_name)
+            code = self.load_package_python(module_name)
         
         if not code and not is_opn_package:
             return ('python', module_name)
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from typing import Iterable, List, Optional, Any
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, TypeVar
 from pathlib import Path
 
-import textwrap
+import ast
+import re
 
-from .package_loader import PackageLoader
 from .visitor import (
     Program,
     Class,
@@ -35,9 +40,13 @@ from .visitor import (
     RangeExpression,
     ListExpression,
     IndexExpression,
+    Node,
 )
 from prisma.config import CALL_ALIASES
 
+# Versión del formato de salida; forma parte de la clave de la caché en disco.
+TRANSPILER_VERSION = "1.0.0"
+
 
 @dataclass
 class ForStatement(Statement):
@@ -53,209 +62,501 @@ class WhileStatement(Statement):
 
 
 class TranspilerError(Exception):
-    def __init__(self, message: str, token: Token | None = None):
-        if token:
+    # ``token`` puede ser un Token o un nodo del AST: ambos exponen line/column.
+    def __init__(self, message: str, token: Token | Node | None = None):
+        if token is not None and token.line:
             super().__init__(f"{message} at line {token.line}, column {token.column}")
         else:
             super().__init__(message)
 
 
+class LexerError(TranspilerError):
+    """Error léxico (cadena sin cerrar, carácter inválido, escape no soportado).
+
+    Como el ``Parser`` consume los tokens a medida que se generan, estos
+    errores aparecen en mitad del análisis; se distinguen de los del parser
+    para propagarlos sin reescribir su mensaje.
+    """
+
+
+# Códigos enteros de tipo de token. ``TOKEN_KINDS`` guarda el nombre de cada
+# código para mensajes y depuración.
+TOKEN_KINDS: Tuple[str, ...] = (
+    "EOF", "IDENT", "NUMBER", "STRING",
+    "FUNC", "MAIN", "LET", "RETURN", "IF", "ELSE", "FOR", "TRY", "CATCH", "IMPORT",
+    "WHILE", "IN", "TRUE", "FALSE", "AND", "OR", "NOT", "CLASS", "THIS", "EXTENDS",
+    "LBRACE", "RBRACE", "LPAREN", "RPAREN", "LBRACKET", "RBRACKET", "SEMICOLON", "COMMA",
+    "PLUS", "MINUS", "STAR", "SLASH", "LT", "GT", "EQUAL", "BANG", "DOT",
+    "EQ", "NEQ", "LTE", "GTE", "RANGE",
+    "COMMENT",
+)
+KIND_CODES = {kind: code for code, kind in enumerate(TOKEN_KINDS)}
+
+(
+    EOF, IDENT, NUMBER, STRING,
+    FUNC, MAIN, LET, RETURN, IF, ELSE, FOR, TRY, CATCH, IMPORT,
+    WHILE, IN, TRUE, FALSE, AND, OR, NOT, CLASS, THIS, EXTENDS,
+    LBRACE, RBRACE, LPAREN, RPAREN, LBRACKET, RBRACKET, SEMICOLON, COMMA,
+    PLUS, MINUS, STAR, SLASH, LT, GT, EQUAL, BANG, DOT,
+    EQ, NEQ, LTE, GTE, RANGE,
+    COMMENT,
+) = range(len(TOKEN_KINDS))
+
+
 @dataclass(slots=True)
 class Token:
-    kind: str
+    kind: int
     value: str
     line: int
     column: int
 
+    @property
+    def kind_name(self) -> str:
+        return TOKEN_KINDS[self.kind]
+
 
 KEYWORDS = {
-    "func": "FUNC",
-    "main": "MAIN",
-    "let": "LET",
-    "return": "RETURN",
-    "if": "IF",
-    "else": "ELSE",
-    "for": "FOR",
-    "try": "TRY",
-    "catch": "CATCH",
-    "import": "IMPORT",
-    "while": "WHILE",
-    "in": "IN",
-    "true": "TRUE",
-    "false": "FALSE",
-    "and": "AND",
-    "or": "OR",
-    "not": "NOT",
-    "class": "CLASS",
-    "this": "THIS",
-    "extends": "EXTENDS",
+    "func": FUNC,
+    "main": MAIN,
+    "let": LET,
+    "return": RETURN,
+    "if": IF,
+    "else": ELSE,
+    "for": FOR,
+    "try": TRY,
+    "catch": CATCH,
+    "import": IMPORT,
+    "while": WHILE,
+    "in": IN,
+    "true": TRUE,
+    "false": FALSE,
+    "and": AND,
+    "or": OR,
+    "not": NOT,
+    "class": CLASS,
+    "this": THIS,
+    "extends": EXTENDS,
 }
 
 
 SYMBOLS = {
-    "{": "LBRACE",
-    "}": "RBRACE",
-    "(": "LPAREN",
-    ")": "RPAREN",
-    "[": "LBRACKET",
-    "]": "RBRACKET",
-    ";": "SEMICOLON",
-    ",": "COMMA",
-    "+": "PLUS",
-    "-": "MINUS",
-    "*": "STAR",
-    "/": "SLASH",
-    "<": "LT",
-    ">": "GT",
-    "=": "EQUAL",
-    "!": "BANG",
-    ".": "DOT",
+    "{": LBRACE,
+    "}": RBRACE,
+    "(": LPAREN,
+    ")": RPAREN,
+    "[": LBRACKET,
+    "]": RBRACKET,
+    ";": SEMICOLON,
+    ",": COMMA,
+    "+": PLUS,
+    "-": MINUS,
+    "*": STAR,
+    "/": SLASH,
+    "<": LT,
+    ">": GT,
+    "=": EQUAL,
+    "!": BANG,
+    ".": DOT,
 }
 
 
 MULTI_SYMBOLS = {
-    "==": "EQ",
-    "!=": "NEQ",
-    "<=": "LTE",
-    ">=": "GTE",
-    "..": "RANGE",
+    "==": EQ,
+    "!=": NEQ,
+    "<=": LTE,
+    ">=": GTE,
+    "..": RANGE,
 }
 
 
-class Lexer:
+# Precedencia (mayor liga más fuerte) y operador Python de cada operador binario.
+BINARY_OPERATORS = {
+    OR: (1, "or"),
+    AND: (2, "and"),
+    EQ: (3, "=="),
+    NEQ: (3, "!="),
+    LT: (4, "<"),
+    LTE: (4, "<="),
+    GT: (4, ">"),
+    GTE: (4, ">="),
+    PLUS: (5, "+"),
+    MINUS: (5, "-"),
+    STAR: (6, "*"),
+    SLASH: (6, "/"),
+}
+
+
+# Espacios y comentarios que preceden a cada token.
+_TRIVIA = r"[ \t\r\n]*(?:(?:\#|//)[^\n]*[ \t\r\n]*|/\*.*?\*/[ \t\r\n]*)*"
+_TOKEN = r"""
+        [^\W\d]\w*
+      | [{}()\[\];,+\-*]
+      | \d+(?:\.(?!\.)\d*)?
+      | ==|!=|<=|>=|\.\.|[<>=!.]
+      | "[^"\\]*(?:\\.[^"\\]*)*"
+      | /(?!\*)
+      | \Z
+"""
+_TOKEN_PATTERN = re.compile(
+    "(" + _TRIVIA + ")"         # 1: espacios y comentarios
+    "(?:(" + _TOKEN + ")"       # 2: token
+    "|(.))",                    # 3: carácter inválido
+    re.VERBOSE | re.DOTALL,
+)
+# _TOKEN_PATTERN sin grupos, para Lexer.tokenize: ``findall`` devuelve cada
+# token junto con su trivia como una sola cadena, y las coincidencias cubren
+# el código fuente de forma contigua. Un '"' o un '/*' sin cerrar y los
+# caracteres inválidos también coinciden; se detectan al clasificarlos.
+_MATCH_PATTERN = re.compile(_TRIVIA + "(?:" + _TOKEN + r"|/\*|.)", re.VERBOSE | re.DOTALL)
+# Comentarios dentro del grupo 1 de _TOKEN_PATTERN (solo con keep_comments).
+_COMMENT_PATTERN = re.compile(r"(?:\#|//)[^\n]*|/\*.*?\*/", re.DOTALL)
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+_ESCAPES = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+
+_FIXED_CODES = {**KEYWORDS, **SYMBOLS, **MULTI_SYMBOLS}
+_LEADING_CODES = {**{digit: NUMBER for digit in "0123456789"}, '"': STRING}
+
+
+def _string_value(literal: str, line: int, column: int) -> str:
+    body = literal[1:-1]
+    if "\\" not in body:
+        return body
+
+    def replace(match: re.Match) -> str:
+        char = match.group(1)
+        if char not in _ESCAPES:
+            raise LexerError(f"Unsupported escape sequence '\\{char}' at line {line}, column {column}")
+        return _ESCAPES[char]
+
+    return _ESCAPE.sub(replace, body)
+
+
+class TokenBuffer(Sequence):
+    """Almacén compacto de tokens en columnas ``array``.
+
+    Guarda por token su código de tipo y su longitud empaquetados
+    (``código | longitud << 8``, ``array('Q')``) y el desplazamiento donde
+    termina (``array('I')``). El valor se recorta del código fuente, y la
+    línea y la columna se calculan con los saltos de línea, solo cuando se
+    piden. Indexar o iterar devuelve objetos ``Token``, así que los
+    consumidores de ``List[Token]`` siguen funcionando.
+    """
+
+    __slots__ = ("source", "packed", "ends", "_line_starts")
+
     def __init__(self, source: str) -> None:
         self.source = source
+        self.packed = array("Q")
+        self.ends = array("I")
+        self._line_starts: Optional[array] = None
+
+    def extend(self, entries: Iterable[Tuple[int, int, str, int, int]]) -> None:
+        add_packed = self.packed.append
+        add_end = self.ends.append
+        for code, offset, text, _, _ in entries:
+            length = len(text)
+            add_packed(code | length << 8)
+            add_end(offset + length)
+
+    def kind(self, index: int) -> int:
+        return self.packed[index] & 0xFF
+
+    def position(self, index: int) -> Tuple[int, int]:
+        """Línea y columna (desde 1) donde empieza el token ``index``."""
+        return self._position(self.ends[index] - (self.packed[index] >> 8))
+
+    def value(self, index: int) -> str:
+        packed = self.packed[index]
+        end = self.ends[index]
+        text = self.source[end - (packed >> 8):end]
+        if packed & 0xFF == STRING:
+            return _string_value(text, *self.position(index))
+        return text
+
+    def _position(self, offset: int) -> Tuple[int, int]:
+        starts = self._line_starts
+        if starts is None:
+            lengths = map((1).__add__, map(len, self.source.split("\n")))
+            starts = self._line_starts = array("I", accumulate(lengths, initial=0))
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+    def __len__(self) -> int:
+        return len(self.packed)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        line, column = self.position(index)
+        return Token(self.packed[index] & 0xFF, self.value(index), line, column)
+
+    def __iter__(self) -> Iterator[Token]:
+        source = self.source
+        self._position(0)
+        starts = self._line_starts
+        # Los desplazamientos crecen: solo se busca la línea cuando se pasa a otra.
+        line = 1
+        line_start = 0
+        next_start = starts[1]
+        for packed, end in zip(self.packed, self.ends):
+            code = packed & 0xFF
+            offset = end - (packed >> 8)
+            if offset >= next_start:
+                line = bisect_right(starts, offset, line)
+                line_start = starts[line - 1]
+                next_start = starts[line]
+            text = source[offset:end]
+            if code == STRING:
+                text = _string_value(text, line, offset - line_start + 1)
+            yield Token(code, text, line, offset - line_start + 1)
+
+
+class _MatchCodes(dict):
+    """``coincidencia -> código | longitud << 8`` para ``Lexer.tokenize``.
+
+    Las coincidencias de ``_MATCH_PATTERN`` (indentación más token) se repiten
+    mucho, así que cada una distinta se clasifica una sola vez, con las mismas
+    reglas que ``Lexer._scan``. Si alguna no es un token válido, ``invalid``
+    queda a ``True``.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.invalid = False
+
+    def __missing__(self, match: str) -> int:
+        _, text, invalid = _TOKEN_PATTERN.match(match).groups()
+        if invalid:
+            self.invalid = True
+            return EOF
+        code = _FIXED_CODES.get(text)
+        if code is None:
+            code = _LEADING_CODES.get(text[0], IDENT) if text else EOF
+        if code == STRING and "\\" in text:
+            try:
+                _string_value(text, 0, 0)
+            except LexerError:
+                self.invalid = True
+        packed = self[match] = code | len(text) << 8
+        return packed
+
+
+def _match_info(match: str) -> Optional[Tuple[int, str, int, int, int]]:
+    """``(código, valor, longitud de la trivia, saltos de línea, inicio de la última línea)``.
+
+    Describe una coincidencia de ``_MATCH_PATTERN`` para ``Lexer.iter_tokens``;
+    el inicio de la última línea es relativo a la coincidencia. Devuelve
+    ``None`` si no es un token válido.
+    """
+    skipped, text, invalid = _TOKEN_PATTERN.match(match).groups()
+    if invalid:
+        return None
+    code = _FIXED_CODES.get(text)
+    if code is None:
+        code = _LEADING_CODES.get(text[0], IDENT) if text else EOF
+    value = text
+    if code == STRING:
+        try:
+            value = _string_value(text, 0, 0)
+        except LexerError:
+            return None
+    return code, value, len(skipped), match.count("\n"), match.rfind("\n") + 1
+
+
+class Lexer:
+    """Tokeniza el código fuente con una única expresión regular maestra.
+
+    Cada coincidencia de ``_TOKEN_PATTERN`` consume los espacios y comentarios
+    previos junto con un token, así que el coste por token es una coincidencia
+    de ``finditer`` y un par de búsquedas en diccionarios, en lugar de varias
+    llamadas a método por carácter. ``iter_tokens`` y ``tokenize`` recorren
+    el código con ``findall`` y clasifican cada coincidencia distinta una sola
+    vez; ``tokenize`` además rellena el ``TokenBuffer`` sin ejecutar código
+    Python por token, y los objetos ``Token`` se crean al leerlo.
+
+    Con ``keep_comments=True`` los comentarios se emiten como tokens
+    ``COMMENT`` (trivia) en lugar de descartarse; el ``Parser`` no los acepta,
+    son para herramientas como el extractor de documentación.
+    """
+
+    def __init__(self, source: str, keep_comments: bool = False) -> None:
+        self.source = source
+        self.keep_comments = keep_comments
         self.length = len(source)
         self.index = 0
         self.line = 1
         self.column = 1
 
-    def tokenize(self) -> List[Token]:
-        tokens: List[Token] = []
-        while not self._is_at_end():
-            char = self._peek()
-            if char in " \t\r\n":
-                self._consume_whitespace()
-                continue
-            if char == "#" or (char == "/" and self._peek_next() == "/"):
-                self._consume_comment()
-                continue
-            token = self._read_token()
-            tokens.append(token)
-        tokens.append(Token("EOF", "", self.line, self.column))
+    def tokenize(self) -> TokenBuffer:
+        tokens = TokenBuffer(self.source)
+        if self.keep_comments or self.index:
+            tokens.extend(self._scan())
+            return tokens
+
+        # Sin bucle por token en Python: findall, una búsqueda en _MatchCodes
+        # por coincidencia y una suma acumulada para los desplazamientos.
+        matches = _MATCH_PATTERN.findall(self.source)
+        codes = _MatchCodes()
+        packed = array("Q", map(codes.__getitem__, matches))
+        if codes.invalid:
+            # _scan lanza el error con su línea y columna
+            for _ in self._scan():
+                pass
+        if len(packed) > 1 and packed[-2] == EOF:
+            # Tras una trivia final que ya coincidió con \Z, findall añade
+            # otra coincidencia vacía.
+            packed.pop()
+            matches.pop()
+        tokens.packed = packed
+        tokens.ends = array("I", accumulate(map(len, matches)))
+        self.index = len(self.source)
+        self.line, self.column = tokens.position(len(tokens) - 1)
         return tokens
 
-    def _read_token(self) -> Token:
-        # Manejo de comentarios de bloque /* ... */
-        if self._peek() == '/' and self._peek_next() == '*':
-            self._consume_block_comment()
-            return self._read_token() # Vuelve a leer después del comentario
-        line, column = self.line, self.column
-        char = self._advance()
-        pair = char + (self._peek() if not self._is_at_end() else "")
-        if pair in MULTI_SYMBOLS:
-            self._advance()
-            return Token(MULTI_SYMBOLS[pair], pair, line, column)
-        if char in SYMBOLS:
-            return Token(SYMBOLS[char], char, line, column)
-        if char.isalpha() or char == "_":
-            return self._identifier(char, line, column)
-        if char.isdigit():
-            return self._number(char, line, column)
-        if char == '"':
-            return self._string(line, column)
-        raise TranspilerError(f"Unexpected character '{char}' at line {line}, column {column}")
-
-    def _consume_whitespace(self) -> None:
-        while not self._is_at_end() and self._peek() in " \t\r\n":
-            char = self._advance()
-            if char == "\n":
-                self.line += 1
-                self.column = 1
-
-    def _consume_comment(self) -> None:
-        while not self._is_at_end() and self._peek() != "\n":
-            self._advance()
-        if not self._is_at_end():
-            self._advance()
-            self.line += 1
-            self.column = 1
-
-    def _consume_block_comment(self) -> None:
-        self._advance()  # Consume /
-        self._advance()  # Consume *
-        while not self._is_at_end() and not (self._peek() == '*' and self._peek_next() == '/'):
-            if self._peek() == '\n':
-                self.line += 1
-                self.column = 1
-            self._advance()
-        self._advance()  # Consume *
-        self._advance()  # Consume /
-
-    def _identifier(self, initial: str, line: int, column: int) -> Token:
-        value = [initial]
-        while not self._is_at_end() and (self._peek().isalnum() or self._peek() in {"_"}):
-            value.append(self._advance())
-        text = "".join(value)
-        kind = KEYWORDS.get(text, "IDENT")
-        return Token(kind, text, line, column)
-
-    def _number(self, initial: str, line: int, column: int) -> Token:
-        value = [initial]
-        has_decimal = False
-        while not self._is_at_end():
-            char = self._peek()
-            if char == "." and not has_decimal and self._peek_next() != ".":
-                has_decimal = True
-                value.append(self._advance())
-                continue
-            if char.isdigit():
-                value.append(self._advance())
-                continue
-            break
-        return Token("NUMBER", "".join(value), line, column)
-
-    def _string(self, line: int, column: int) -> Token:
-        value: List[str] = []
-        while not self._is_at_end():
-            char = self._advance()
-            if char == '"':
-                return Token("STRING", "".join(value), line, column)
-            if char == "\\":
-                escaped = self._advance()
-                value.append(self._escape(escaped))
-            else:
-                value.append(char)
-        raise TranspilerError(f"Unterminated string at line {line}, column {column}")
+    def iter_tokens(self) -> Iterator[Token]:
+        """Genera los tokens bajo demanda, sin materializar la lista completa."""
+        if self.keep_comments or self.index:
+            for code, _, text, line, column in self._scan():
+                if code == STRING:
+                    text = _string_value(text, line, column)
+                yield Token(code, text, line, column)
+            return
 
-    def _escape(self, char: str) -> str:
-        escapes = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
-        if char not in escapes:
-            raise TranspilerError(f"Unsupported escape sequence '\\{char}' at line {self.line}, column {self.column}")
-        return escapes[char]
+        # Como tokenize: cada coincidencia distinta de findall se clasifica una
+        # sola vez, y por token solo queda actualizar línea y columna.
+        infos: Dict[str, Optional[Tuple[int, str, int, int, int]]] = {}
+        pos = 0
+        line = 1
+        line_start = 0
+        for match in _MATCH_PATTERN.findall(self.source):
+            info = infos.get(match)
+            if info is None:
+                info = infos[match] = _match_info(match)
+                if info is None:
+                    # _scan lanza el error con su línea y columna
+                    for _ in self._scan():
+                        pass
+            code, value, skip, newlines, last_line = info
+            if newlines:
+                trivia_newlines = match.count("\n", 0, skip)
+                if trivia_newlines:
+                    line += trivia_newlines
+                    line_start = pos + match.rfind("\n", 0, skip) + 1
+                column = pos + skip - line_start + 1
+                if trivia_newlines != newlines:
+                    # Cadena con saltos de línea: el token siguiente empieza más abajo
+                    token = Token(code, value, line, column)
+                    line += newlines - trivia_newlines
+                    line_start = pos + last_line
+                    yield token
+                    pos += len(match)
+                    continue
+                yield Token(code, value, line, column)
+            else:
+                yield Token(code, value, line, pos + skip - line_start + 1)
+            pos += len(match)
+            if code == EOF:
+                break
+        self.index = pos
+        self.line = line
+        self.column = pos - line_start + 1
+
+    def _scan(self) -> Iterator[Tuple[int, int, str, int, int]]:
+        """Produce ``(código, desplazamiento, texto, línea, columna)`` por token."""
+        matches = map(re.Match.groups, _TOKEN_PATTERN.finditer(self.source, self.index))
+        fixed = _FIXED_CODES
+        leading = _LEADING_CODES
+        pos = self.index
+        line = self.line
+        line_start = pos - self.column + 1
+        keep_comments = self.keep_comments
+
+        for skipped, text, invalid in matches:
+            if skipped:
+                if keep_comments:
+                    yield from self._comments(skipped, pos, line, line_start)
+                pos += len(skipped)
+                if "\n" in skipped:
+                    line += skipped.count("\n")
+                    line_start = pos - len(skipped) + skipped.rfind("\n") + 1
+            if not text:
+                if invalid:
+                    self._invalid(invalid, line, pos - line_start + 1)
+                break
+            code = fixed.get(text)
+            if code is None:
+                code = leading.get(text[0], IDENT)
+            yield code, pos, text, line, pos - line_start + 1
+            if code == STRING:
+                if "\\" in text:
+                    _string_value(text, line, pos - line_start + 1)
+                if "\n" in text:
+                    line += text.count("\n")
+                    line_start = pos + text.rfind("\n") + 1
+            pos += len(text)
+
+        self.index = pos
+        self.line = line
+        self.column = pos - line_start + 1
+        yield EOF, pos, "", line, self.column
+
+    @staticmethod
+    def _comments(skipped: str, pos: int, line: int, line_start: int) -> Iterator[Tuple[int, int, str, int, int]]:
+        """Tokens ``COMMENT`` del tramo ``skipped`` que empieza en ``pos``."""
+        scanned = 0
+        for match in _COMMENT_PATTERN.finditer(skipped):
+            start = match.start()
+            newlines = skipped.count("\n", scanned, start)
+            if newlines:
+                line += newlines
+                line_start = pos + skipped.rfind("\n", scanned, start) + 1
+            text = match.group()
+            yield COMMENT, pos + start, text, line, pos + start - line_start + 1
+            scanned = start
+
+    def _invalid(self, char: str, line: int, column: int) -> None:
+        if char == '"':
+            raise LexerError(f"Unterminated string at line {line}, column {column}")
+        if char == "/":
+            raise LexerError(f"Unterminated block comment at line {line}, column {column}")
+        raise LexerError(f"Unexpected character '{char}' at line {line}, column {column}")
 
-    def _peek(self) -> str:
-        return self.source[self.index]
 
-    def _peek_next(self) -> str:
-        if self.index + 1 >= self.length:
-            return "\0"
-        return self.source[self.index + 1]
+N = TypeVar("N", bound=Node)
 
-    def _advance(self) -> str:
-        char = self.source[self.index]
-        self.index += 1
-        self.column += 1
-        return char
 
-    def _is_at_end(self) -> bool:
-        return self.index >= self.length
+def _at(node: N, start: Any) -> N:
+    """Anota en ``node`` la posición de ``start`` (un ``Token`` u otro nodo)."""
+    node.line = start.line
+    node.column = start.column
+    return node
 
 
 class Parser:
-    def __init__(self, tokens: List[Token]) -> None:
-        self.tokens = tokens
-        self.current = 0
+    """Parser descendente recursivo.
+
+    Solo necesita el token actual y el siguiente (``_peek``/``_peek_next``),
+    así que consume ``tokens`` como un flujo con un búfer de anticipación
+    acotado. Si recibe una secuencia (``TokenBuffer``), la conserva en
+    ``Program.tokens``; si recibe un iterador (``Lexer.iter_tokens``),
+    ``Program.tokens`` es ``None``.
+    """
+
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        self.tokens: Optional[Sequence] = tokens if isinstance(tokens, Sequence) else None
+        self._stream = iter(tokens)
+        self._current: Token = next(self._stream)
+        self._next: Optional[Token] = None
+        self._last: Optional[Token] = None
+        # Despacho por tipo de token de las sentencias que empiezan con palabra clave.
+        self._statement_parsers = {
+            LET: self._let_statement,
+            RETURN: self._return_statement,
+            IF: self._if_statement,
+            FOR: self._for_statement,
+            WHILE: self._while_statement,
+            TRY: self._try_statement,
+        }
 
     def parse(self) -> Program:
         # In OPN, top-level statements are only allowed inside func/main blocks.
@@ -265,281 +566,235 @@ class Parser:
         statements: List = []  # For REPL mode in the future
         classes: List[Class] = []
 
-        while not self._match("EOF"):
-            if self._check("IMPORT"):
-                statements.append(self._import_statement())
-            elif self._check("FUNC"):
-                self._advance() # Consume 'FUNC'
-                functions.append(self._function_declaration())
-            elif self._check("MAIN"):
-                self._advance() # Consume 'MAIN'
-                functions.append(self._main_block())
-            elif self._check("CLASS"):
+        while not self._match(EOF):
+            if self._check(IMPORT):
+                start = self._advance() # Consume 'IMPORT'
+                statements.append(self._import_statement(start))
+            elif self._check(FUNC):
+                start = self._advance() # Consume 'FUNC'
+                functions.append(self._function_declaration(start))
+            elif self._check(MAIN):
+                start = self._advance() # Consume 'MAIN'
+                functions.append(self._main_block(start))
+            elif self._check(CLASS):
                 classes.append(self._class_declaration())
             else:
                 # For REPL mode, parse other statements at the top level
                 try:
                     # Attempt to parse as a statement for REPL-like behavior
                     statements.append(self._statement())
+                except LexerError:
+                    raise  # El mensaje del lexer ya señala el problema real
                 except TranspilerError:
                     token = self._peek()
                     # If we are not at EOF, it's a real error.
-                    if token.kind != "EOF":
+                    if token.kind != EOF:
                         raise TranspilerError(f"Unexpected token '{token.value}'. Only 'func', 'main', 'class', or 'import' are allowed at the top level.", token)
         return Program(functions=functions, statements=statements, classes=classes, tokens=self.tokens)
 
     def _class_declaration(self) -> Class:
-        self._consume("CLASS", "Expected 'class' keyword.")
-        name = self._consume("IDENT", "Expected class name.").value
+        start = self._consume(CLASS, "Expected 'class' keyword.")
+        name = self._consume(IDENT, "Expected class name.").value
         superclass = None
-        if self._match("EXTENDS"):
-            superclass_name = self._consume("IDENT", "Expected superclass name.")
-            superclass = Identifier(superclass_name.value)
+        if self._match(EXTENDS):
+            superclass_name = self._consume(IDENT, "Expected superclass name.")
+            superclass = _at(Identifier(superclass_name.value), superclass_name)
         
         body = self._block()
-        return Class(name, superclass, body)
+        return _at(Class(name, superclass, body), start)
 
-    def _import_statement(self) -> ImportStatement:
-        name = self._consume("IDENT", "Expected module name after 'import'")
-        self._consume("SEMICOLON", "Expected ';' after module name")
-        return ImportStatement(name.value)
+    def _import_statement(self, start: Token) -> ImportStatement:
+        name = self._consume(IDENT, "Expected module name after 'import'")
+        self._consume(SEMICOLON, "Expected ';' after module name")
+        return _at(ImportStatement(name.value), start)
 
-    def _function_declaration(self) -> Function:
-        name = self._consume("IDENT", "Expected function name")
-        self._consume("LPAREN", "Expected '(' after function name")
+    def _function_declaration(self, start: Token) -> Function:
+        name = self._consume(IDENT, "Expected function name")
+        self._consume(LPAREN, "Expected '(' after function name")
         parameters = self._parameters()
-        self._consume("RPAREN", "Expected ')' after parameters")
+        self._consume(RPAREN, "Expected ')' after parameters")
         body = self._block()
-        return Function(name.value, parameters, body)
+        return _at(Function(name.value, parameters, body), start)
 
-    def _main_block(self) -> Function:
+    def _main_block(self, start: Token) -> Function:
         body = self._block()
-        return Function("main", [], body)
+        return _at(Function("main", [], body), start)
 
     def _parameters(self) -> List[Parameter]:
         params: List[Parameter] = []
-        if self._check("RPAREN"):
+        if self._check(RPAREN):
             return params
         while True:
-            name = self._consume("IDENT", "Expected parameter name")
-            params.append(Parameter(name.value))
-            if not self._match("COMMA"):
+            name = self._consume(IDENT, "Expected parameter name")
+            params.append(_at(Parameter(name.value), name))
+            if not self._match(COMMA):
                 break
         return params
 
     def _block(self) -> Block:
-        self._consume("LBRACE", "Expected '{' to start block")
+        start = self._consume(LBRACE, "Expected '{' to start block")
         statements: List = []
-        while not self._check("RBRACE"):
+        while not self._check(RBRACE):
             statements.append(self._statement())
-        self._consume("RBRACE", "Expected '}' to close block")
-        return Block(statements)
+        self._consume(RBRACE, "Expected '}' to close block")
+        return _at(Block(statements), start)
 
     def _statement(self):
-        if self._match("LET"):
-            name = self._consume("IDENT", "Expected identifier after let")
-            self._consume("EQUAL", "Expected '=' in let statement")
-            value = self._expression()
-            self._consume("SEMICOLON", "Expected ';' after let statement")
-            return LetStatement(name.value, value)
-        
+        parse_keyword = self._statement_parsers.get(self._current.kind)
+        if parse_keyword is not None:
+            return parse_keyword(self._advance())
+
         # Manejo de reasignación (sin 'set')
-        if self._check("IDENT") and self._peek_next().kind == "EQUAL":
-            name = self._consume("IDENT", "Expected identifier after set")
-            self._consume("EQUAL", "Expected '=' in set statement")
+        if self._current.kind == IDENT and self._peek_next().kind == EQUAL:
+            name = self._consume(IDENT, "Expected identifier after set")
+            self._consume(EQUAL, "Expected '=' in set statement")
             value = self._expression()
-            self._consume("SEMICOLON", "Expected ';' after set statement")
-            return SetStatement(name.value, value)
+            self._consume(SEMICOLON, "Expected ';' after set statement")
+            return _at(SetStatement(name.value, value), name)
 
-        if self._match("RETURN"):
-            if self._check("SEMICOLON"):
-                self._advance()
-                return ReturnStatement(None)
-            value = self._expression()
-            self._consume("SEMICOLON", "Expected ';' after return value")
-            return ReturnStatement(value)
-        if self._match("IF"):
-            condition = self._expression()
-            consequence = self._block()
-            alternative = None
-            if self._match("ELSE"):
-                if self._match("IF"):
-                    alternative = self._statement()
-                else:
-                    alternative = self._block()
-            return IfStatement(condition, consequence, alternative)
-        if self._match("FOR"):
-            target = self._consume("IDENT", "Expected loop variable")
-            self._consume("IN", "Expected 'in' after loop variable")
-            iterable = self._expression()
-            if self._match("RANGE"):
-                end_expr = self._expression()
-                iterable = RangeExpression(iterable, end_expr)
-            body = self._block()
-            return ForStatement(target.value, iterable, body)
-        if self._match("WHILE"):
-            condition = self._expression()
-            body = self._block()
-            return WhileStatement(condition, body)
-        if self._match("TRY"):
-            try_block = self._block()
-            self._consume("CATCH", "Expected 'catch' after try block")
-            error_variable = None
-            if self._check("IDENT"):
-                error_variable = self._consume("IDENT", "Expected error variable name").value
-            catch_block = self._block()
-            return TryStatement(try_block, error_variable, catch_block)
-        
         # Si ninguna de las palabras clave de declaración coincide,
         # se asume que es una declaración de expresión (ej. una llamada a función).
         expr = self._expression()
-        self._consume("SEMICOLON", "Expected ';' after expression")
-        return ExpressionStatement(expr)
-
-    def _expression(self) -> Expression:
-        return self._or()
-
-    def _or(self) -> Expression:
-        expr = self._and()
-        while self._match("OR"):
-            operator = "or"
-            right = self._and()
-            expr = BinaryOperation(expr, operator, right)
-        return expr
-
-    def _and(self) -> Expression:
-        expr = self._equality()
-        while self._match("AND"):
-            operator = "and"
-            right = self._equality()
-            expr = BinaryOperation(expr, operator, right)
-        return expr
-
-    def _equality(self) -> Expression:
-        expr = self._comparison()
-        while True:
-            if self._match("EQ"):
-                right = self._comparison()
-                expr = BinaryOperation(expr, "==", right)
-            elif self._match("NEQ"):
-                right = self._comparison()
-                expr = BinaryOperation(expr, "!=", right)
-            else:
-                break
-        return expr
-
-    def _comparison(self) -> Expression:
-        expr = self._term()
-        while True:
-            if self._match("LT"):
-                right = self._term()
-                expr = BinaryOperation(expr, "<", right)
-            elif self._match("LTE"):
-                right = self._term()
-                expr = BinaryOperation(expr, "<=", right)
-            elif self._match("GT"):
-                right = self._term()
-                expr = BinaryOperation(expr, ">", right)
-            elif self._match("GTE"):
-                right = self._term()
-                expr = BinaryOperation(expr, ">=", right)
+        self._consume(SEMICOLON, "Expected ';' after expression")
+        return _at(ExpressionStatement(expr), expr)
+
+    def _let_statement(self, start: Token) -> LetStatement:
+        name = self._consume(IDENT, "Expected identifier after let")
+        self._consume(EQUAL, "Expected '=' in let statement")
+        value = self._expression()
+        self._consume(SEMICOLON, "Expected ';' after let statement")
+        return _at(LetStatement(name.value, value), start)
+
+    def _return_statement(self, start: Token) -> ReturnStatement:
+        if self._match(SEMICOLON):
+            return _at(ReturnStatement(None), start)
+        value = self._expression()
+        self._consume(SEMICOLON, "Expected ';' after return value")
+        return _at(ReturnStatement(value), start)
+
+    def _if_statement(self, start: Token) -> IfStatement:
+        condition = self._expression()
+        consequence = self._block()
+        alternative = None
+        if self._match(ELSE):
+            if self._match(IF):
+                alternative = self._statement()
             else:
-                break
-        return expr
-
-    def _term(self) -> Expression:
-        expr = self._factor()
-        while True:
-            if self._match("PLUS"):
-                right = self._factor()
-                expr = BinaryOperation(expr, "+", right)
-            elif self._match("MINUS"):
-                right = self._factor()
-                expr = BinaryOperation(expr, "-", right)
-            else:
-                break
-        return expr
+                alternative = self._block()
+        return _at(IfStatement(condition, consequence, alternative), start)
+
+    def _for_statement(self, start: Token) -> ForStatement:
+        target = self._consume(IDENT, "Expected loop variable")
+        self._consume(IN, "Expected 'in' after loop variable")
+        iterable = self._expression()
+        if self._match(RANGE):
+            end_expr = self._expression()
+            iterable = _at(RangeExpression(iterable, end_expr), iterable)
+        body = self._block()
+        return _at(ForStatement(target.value, iterable, body), start)
 
-    def _factor(self) -> Expression:
+    def _while_statement(self, start: Token) -> WhileStatement:
+        condition = self._expression()
+        body = self._block()
+        return _at(WhileStatement(condition, body), start)
+
+    def _try_statement(self, start: Token) -> TryStatement:
+        try_block = self._block()
+        self._consume(CATCH, "Expected 'catch' after try block")
+        error_variable = None
+        if self._check(IDENT):
+            error_variable = self._advance().value
+        catch_block = self._block()
+        return _at(TryStatement(try_block, error_variable, catch_block), start)
+
+    def _expression(self, min_precedence: int = 1) -> Expression:
+        # Precedencia por escalada (Pratt): una búsqueda en BINARY_OPERATORS por
+        # token decide si el operador continúa la expresión actual.
         expr = self._unary()
         while True:
-            if self._match("STAR"):
-                right = self._unary()
-                expr = BinaryOperation(expr, "*", right)
-            elif self._match("SLASH"):
-                right = self._unary()
-                expr = BinaryOperation(expr, "/", right)
-            else:
-                break
-        return expr
+            operator = BINARY_OPERATORS.get(self._current.kind)
+            if operator is None or operator[0] < min_precedence:
+                return expr
+            self._advance()
+            right = self._expression(operator[0] + 1)
+            expr = _at(BinaryOperation(expr, operator[1], right), expr)
 
     def _unary(self) -> Expression:
-        if self._match("NOT"):
-            operand = self._unary()
-            return UnaryOperation("not", operand)
-        if self._match("MINUS"):
-            operand = self._unary()
-            return UnaryOperation("-", operand)
+        start = self._current
+        if start.kind == NOT:
+            self._advance()
+            return _at(UnaryOperation("not", self._unary()), start)
+        if start.kind == MINUS:
+            self._advance()
+            return _at(UnaryOperation("-", self._unary()), start)
         return self._call()
 
     def _call(self) -> Expression:
         expr = self._primary()
         while True:
-            if self._match("LPAREN"):
+            kind = self._current.kind
+            if kind == LPAREN:
+                self._advance()
                 arguments = self._arguments()
-                expr = CallExpression(expr, arguments)
-            elif self._match("DOT"):
-                name = self._consume("IDENT", "Expected attribute name")
-                expr = Attribute(expr, name.value)
-            elif self._match("LBRACKET"):
+                expr = _at(CallExpression(expr, arguments), expr)
+            elif kind == DOT:
+                self._advance()
+                name = self._consume(IDENT, "Expected attribute name")
+                expr = _at(Attribute(expr, name.value), expr)
+            elif kind == LBRACKET:
+                self._advance()
                 index = self._expression()
-                self._consume("RBRACKET", "Expected ']' after index")
-                expr = IndexExpression(expr, index)
+                self._consume(RBRACKET, "Expected ']' after index")
+                expr = _at(IndexExpression(expr, index), expr)
             else:
-                break
-        return expr
+                return expr
 
     def _arguments(self) -> List[Expression]:
         args: List[Expression] = []
-        if self._check("RPAREN"):
-            self._consume("RPAREN", "Expected ')' after arguments")
+        if self._check(RPAREN):
+            self._consume(RPAREN, "Expected ')' after arguments")
             return args
         while True:
             args.append(self._expression())
-            if self._match("COMMA"):
+            if self._match(COMMA):
                 continue
             break
-        self._consume("RPAREN", "Expected ')' after arguments")
+        self._consume(RPAREN, "Expected ')' after arguments")
         return args
 
     def _primary(self) -> Expression:
-        if self._match("NUMBER"):
-            token = self._previous()
+        token = self._current
+        kind = token.kind
+        if kind == IDENT:
+            self._advance()
+            return _at(Identifier(token.value), token)
+        if kind == NUMBER:
+            self._advance()
             if "." in token.value:
-                return Literal(float(token.value))
-            return Literal(int(token.value))
-        if self._match("STRING"):
-            return Literal(self._previous().value)
-        if self._match("TRUE"):
-            return Literal(True)
-        if self._match("FALSE"):
-            return Literal(False)
-        if self._match("IDENT"):
-            return Identifier(self._previous().value)
-        if self._match("THIS"):
-            return This()
-        if self._match("LPAREN"):
+                return _at(Literal(float(token.value)), token)
+            return _at(Literal(int(token.value)), token)
+        if kind == STRING:
+            self._advance()
+            return _at(Literal(token.value), token)
+        if kind == TRUE or kind == FALSE:
+            self._advance()
+            return _at(Literal(kind == TRUE), token)
+        if kind == THIS:
+            self._advance()
+            return _at(This(), token)
+        if kind == LPAREN:
+            self._advance()
             expr = self._expression()
-            self._consume("RPAREN", "Expected ')' after expression")
+            self._consume(RPAREN, "Expected ')' after expression")
             return expr
-        if self._match("LBRACKET"):
+        if kind == LBRACKET:
+            self._advance()
             elements = self._list_elements()
-            self._consume("RBRACKET", "Expected ']' to close list")
-            return ListExpression(elements)
-        token = self._peek() # Obtener el token ofensivo
-        raise TranspilerError(f"Unexpected token '{token.value}'", token)
+            self._consume(RBRACKET, "Expected ']' to close list")
+            return _at(ListExpression(elements), token)
+        raise TranspilerError(f"Unexpected token '{token.value}'", token) # Token ofensivo
 
-    def _match(self, kind: str) -> bool:
+    def _match(self, kind: int) -> bool:
         if self._check(kind):
             self._advance()
             return True
@@ -547,20 +802,18 @@ class Parser:
 
     def _list_elements(self) -> List[Expression]:
         elements: List[Expression] = []
-        if self._check("RBRACKET"):
+        if self._check(RBRACKET):
             return elements
         while True:
             elements.append(self._expression())
-            if not self._match("COMMA"):
+            if not self._match(COMMA):
                 break
         return elements
 
-    def _check(self, kind: str) -> bool:
-        if self.current >= len(self.tokens):
-            return kind == "EOF"
-        return self.tokens[self.current].kind == kind
+    def _check(self, kind: int) -> bool:
+        return self._current.kind == kind
 
-    def _consume(self, kind: str, message: str) -> Token:
+    def _consume(self, kind: int, message: str) -> Token:
         if self._check(kind):
             return self._advance()
         token = self._peek() # Obtener el token ofensivo
@@ -568,22 +821,28 @@ class Parser:
 
     def _advance(self) -> Token:
         if not self._is_at_end():
-            self.current += 1
-        return self.tokens[self.current - 1]
+            self._last = self._current
+            if self._next is not None:
+                self._current, self._next = self._next, None
+            else:
+                self._current = next(self._stream)
+        return self._last
 
     def _is_at_end(self) -> bool:
-        return self._peek().kind == "EOF"
+        return self._current.kind == EOF
 
     def _peek(self) -> Token:
-        return self.tokens[self.current]
+        return self._current
 
     def _peek_next(self) -> Token:
-        if self.current + 1 >= len(self.tokens):
-            return self.tokens[-1]
-        return self.tokens[self.current + 1]
+        if self._next is None:
+            if self._is_at_end():
+                return self._current
+            self._next = next(self._stream)
+        return self._next
 
     def _previous(self) -> Token:
-        return self.tokens[self.current - 1]
+        return self._last
 
 
 CALL_ALIASES = {
@@ -601,104 +860,104 @@ CALL_ALIASES = {
 }
 
 
-RUNTIME_PREAMBLE = textwrap.dedent(
-    """
-import time
-import random
-
-_PROFILING_DATA = {}
-
-def profiler(func):
-    \"\"\"A simple decorator to profile function execution time.\"\"\"
-    def wrapper(*args, **kwargs):
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        duration = (end_time - start_time) * 1000  # in ms
-        
-        # Store cumulative time
-        _PROFILING_DATA[func.__name__] = _PROFILING_DATA.get(func.__name__, 0) + duration
-        
-        print(f"[PROFILE] {func.__name__} executed in {duration:.4f} ms")
-        return result
-    return wrapper
-
-def c_printf(format_string, *values):
-    print(format_string % values)
-
-
-def cpp_cout(value):
-    print(value)
-
-
-def cs_write_line(value):
-    print(value)
-
-
-def py_print(*values):
-    print(*values)
-
-
-def py_breakpoint():
-    breakpoint()
-
-
-def py_input(prompt=""):
-    return input(prompt)
-
-
-def py_random_randint(a, b):
-    return random.randint(a, b)
-
-
-def css_set(selector, prop, value):
-    rule = f"{selector} {{ {prop}: {value}; }}"
-    _styles.append(rule)
-    print(f"css: {rule}")
-
-
-def js_log(value):
-    print(f"js: {value}")
+# Espacios de nombres que el código OPN usa sin declararlos. El emisor solo
+# añade la importación de los que el programa referencia realmente.
+NAMESPACE_IMPORTS = {
+    "math": "import math",
+    "random": "import random",
+    "time": "import time",
+    "gfx": "from prisma import pygfx_api as gfx",
+    "server": "from prisma import server_api as server",
+}
 
+RUNTIME_MODULE = "prisma.runtime"
+# Se emite cuando el programa tiene algún 'import' (ver prisma/importer.py).
+PACKAGE_IMPORTER_IMPORT = "import prisma.importer"
+PACKAGE_IMPORTER_INSTALL = "prisma.importer.install()"
+RUNTIME_MODES = ("inline", "import")
 
-def to_string(value):
-    return str(value)
 
+@lru_cache(maxsize=None)
+def _runtime_parts() -> Dict[str, Tuple[str, FrozenSet[str], bool]]:
+    """Trocea ``prisma/runtime.py`` en sus definiciones de primer nivel.
 
-def to_number(value):
-    try:
-        return int(value)
-    except ValueError:
-        return float(value)
-    except TypeError:
-        raise ValueError("Cannot convert value to number")
-    except Exception as exc:
-        raise ValueError("Cannot convert value to number") from exc
+    Devuelve, en el orden del archivo, ``nombre -> (código, nombres usados,
+    es_import)`` para cada importación, función o asignación global, de modo
+    que el emisor pueda copiar solo los helpers que el programa necesita junto
+    con sus dependencias.
     """
-)
+    path = Path(__file__).resolve().parents[1] / "runtime.py"
+    source = path.read_text(encoding="utf-8")
+    parts: Dict[str, Tuple[str, FrozenSet[str], bool]] = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                parts[alias.asname or alias.name] = (f"import {alias.name}", frozenset(), True)
+            continue
+        if isinstance(node, ast.FunctionDef):
+            name = node.name
+        elif isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+        else:
+            continue
+        if name == "__all__":
+            continue
+        used = frozenset(child.id for child in ast.walk(node) if isinstance(child, ast.Name))
+        parts[name] = (ast.get_source_segment(source, node), used, False)
+    return parts
+
+
+def _runtime_closure(names: Iterable[str]) -> List[str]:
+    """Nombres del runtime necesarios para ``names``, en el orden del archivo."""
+    parts = _runtime_parts()
+    pending = [name for name in names if name in parts]
+    needed = set(pending)
+    while pending:
+        for dependency in parts[pending.pop()][1]:
+            if dependency in parts and dependency not in needed:
+                needed.add(dependency)
+                pending.append(dependency)
+    return [name for name in parts if name in needed]
 
 
 class PythonEmitter:
-    def __init__(self, tokens: List[Token]) -> None:
+    # Los espacios de nombres usados se recogen al recorrer el AST, así que el
+    # emisor no necesita la lista de tokens y el parser puede ir en streaming.
+    needs_tokens = False
+
+    def __init__(self, tokens: Optional[Sequence] = None) -> None:
         self.lines: List[str] = []
         self.indent = 0
         self.is_repl = False
+        self.profile = False
         self.imported_modules = set()
+        self.used_namespaces = set()
+        self.used_helpers = set()
+        self.uses_package_importer = False
         self.tokens = tokens
-        self.package_loader = PackageLoader()
 
-    def emit(self, program: Program, is_repl: bool = False, source_file: str = None) -> str:
+    def emit(
+        self,
+        program: Program,
+        is_repl: bool = False,
+        source_file: str = None,
+        runtime: str = "inline",
+        profile: bool = False,
+    ) -> str:
+        if runtime not in RUNTIME_MODES:
+            raise TranspilerError(f"Unknown runtime mode '{runtime}'. Use one of: {', '.join(RUNTIME_MODES)}")
         self.is_repl = is_repl
+        self.profile = profile
         self.lines = []
+        self.used_namespaces = set()
+        self.used_helpers = set()
+        self.uses_package_importer = False
         
         is_data_file = False
         if source_file:
             file_ext = Path(source_file).suffix.lower()
             is_data_file = file_ext == '.opn'
 
-        source_text = " ".join(t.value for t in self.tokens)
-        needs_gfx = "gfx" in source_text
-
         for statement in program.statements:
             self._visit_statement(statement)
 
@@ -718,10 +977,7 @@ class PythonEmitter:
         if is_repl:
             return body
 
-        preamble = RUNTIME_PREAMBLE.rstrip()
-        
-        if needs_gfx:
-            preamble += "\n\nfrom prisma import pygfx_api as gfx"
+        preamble = self._render_preamble(runtime)
 
         main_guard = ""
         # Only add the main guard if a 'main' function actually exists.
@@ -731,12 +987,37 @@ class PythonEmitter:
         segments = [preamble, body, main_guard]
         return "\n\n".join(filter(None, segments)).rstrip() + "\n"
 
+    def _render_preamble(self, runtime: str) -> str:
+        """Importaciones y helpers del runtime que el programa usa realmente."""
+        parts = _runtime_parts()
+        helpers = _runtime_closure(self.used_helpers)
+        imports = [statement for name, statement in NAMESPACE_IMPORTS.items() if name in self.used_namespaces]
+        if runtime == "import":
+            exported = [name for name in helpers if not parts[name][2] and not name.startswith("_")]
+            if exported:
+                imports.append(f"from {RUNTIME_MODULE} import {', '.join(exported)}")
+            definitions = []
+        else:
+            imports.extend(parts[name][0] for name in helpers if parts[name][2])
+            definitions = [parts[name][0] for name in helpers if not parts[name][2]]
+
+        if self.uses_package_importer:
+            imports.append(PACKAGE_IMPORTER_IMPORT)
+            definitions.insert(0, PACKAGE_IMPORTER_INSTALL)
+
+        # Primero los 'import x' y después los 'from x import y', sin repetir.
+        imports = sorted(set(imports), key=lambda statement: (statement.startswith("from "), statement))
+        segments = ["\n".join(imports)] + definitions
+        return "\n\n".join(filter(None, segments))
+
     def _emit_line(self, text: str) -> None:
         self.lines.append("    " * self.indent + text)
 
     def _visit_function(self, function: Function) -> None:
         params = ", ".join(param.name for param in function.parameters)
-        self._emit_line("@profiler")
+        if self.profile:
+            self.used_helpers.add("profiler")
+            self._emit_line("@profiler")
         self._emit_line(f"def {function.name}({params}):")
         self.indent += 1
         self._emit_statements(function.body.statements)
@@ -769,12 +1050,19 @@ class PythonEmitter:
         if isinstance(statement, LetStatement):
             self._emit_line(f"{statement.name} = {self._render_expression(statement.value)}")
         elif isinstance(statement, ImportStatement):
-            import_type, import_value = self.package_loader.resolve_import(statement.module)
-            if import_type == 'opn':
-                self._emit_line(f"# OPN Package: {statement.module}")
-                self._emit_line(import_value)
-            else:
-                self._emit_line(f"import {import_value}")
+            # Los paquetes OPN se importan como módulos a través de prisma.importer,
+            # que los carga una sola vez por proceso. El 'import *' mantiene sus
+            # funciones accesibles sin prefijo, como cuando se copiaban en línea.
+            # Si el módulo es un paquete OPN se decide al ejecutar, no al
+            # transpilar: la salida no depende de los paquetes instalados, así
+            # que puede cachearse aunque se instalen o desinstalen después.
+            if self.is_repl and not self.uses_package_importer:
+                self._emit_line(PACKAGE_IMPORTER_IMPORT)
+                self._emit_line(PACKAGE_IMPORTER_INSTALL)
+            self.uses_package_importer = True
+            self._emit_line(f"import {statement.module}")
+            self._emit_line(f"if prisma.importer.is_opn_package({statement.module}):")
+            self._emit_line(f"    from {statement.module} import *")
         elif isinstance(statement, Function):
             # Manejar funciones anidadas o métodos de clase
             func_name = statement.name
@@ -827,7 +1115,7 @@ class PythonEmitter:
             self._emit_statements(statement.catch_block.statements)
             self.indent -= 1
         else:
-            raise TranspilerError("Unsupported statement")
+            raise TranspilerError("Unsupported statement", statement)
 
     def _render_expression(self, expression: Expression) -> str:
         if isinstance(expression, Literal):
@@ -835,6 +1123,10 @@ class PythonEmitter:
                 return repr(expression.value)
             return str(expression.value)
         if isinstance(expression, Identifier):
+            if expression.value in NAMESPACE_IMPORTS:
+                self.used_namespaces.add(expression.value)
+            elif expression.value in _runtime_parts():
+                self.used_helpers.add(expression.value)
             return expression.value
         if isinstance(expression, This):
             return "self"
@@ -861,24 +1153,15 @@ class PythonEmitter:
             index = self._render_expression(expression.index)
             return f"{target}[{index}]"
         if isinstance(expression, CallExpression):
-            # --- Modificación para Inyección de Línea ---
-            # Si la llamada es a 'py.print', inyectamos el número de línea como primer argumento.
-            callee_token = self._get_token_for_expression(expression.callee)
-            is_py_print = self._resolve_name(expression.callee) == "py.print"
-
-            if is_py_print and callee_token:
-                line_number = callee_token.line
-                args = f"{line_number}, " + ", ".join(self._render_expression(arg) for arg in expression.arguments)
-            else:
-                args = ", ".join(self._render_expression(arg) for arg in expression.arguments)
-
+            args = ", ".join(self._render_expression(arg) for arg in expression.arguments)
             callee_name = self._resolve_name(expression.callee)
             if callee_name in CALL_ALIASES:
                 callee = CALL_ALIASES[callee_name]
+                self.used_helpers.add(callee)
             else:
                 callee = self._render_expression(expression.callee)
             return f"{callee}({args})"
-        raise TranspilerError("Unsupported expression")
+        raise TranspilerError("Unsupported expression", expression)
 
     def _resolve_name(self, expression: Expression) -> Optional[str]:
         if isinstance(expression, Identifier):
@@ -890,36 +1173,31 @@ class PythonEmitter:
             return f"{base}.{expression.attribute}"
         return None
 
-    def _get_token_for_expression(self, expression: Expression) -> Optional[Token]:
-        """Intenta encontrar el token inicial para una expresión para obtener su línea."""
-        if hasattr(expression, 'value') and isinstance(expression.value, str):
-            # Heurística para Identifier y otros nodos simples
-            for token in self.tokens:
-                if token.value == expression.value:
-                    return token
-        return None
-
 
 class OPNTranspiler:
     def __init__(self, source: str) -> None:
         self.source = source
 
-    def parse(self) -> Program:
+    def parse(self, keep_tokens: bool = True) -> Program:
         lexer = Lexer(self.source)
-        tokens = lexer.tokenize()
+        tokens = lexer.tokenize() if keep_tokens else lexer.iter_tokens()
         parser = Parser(tokens)
         return parser.parse()
 
-    def transpile(self, is_repl: bool = False, source_file: str = None) -> str:
-        program = self.parse()
+    def transpile(
+        self, is_repl: bool = False, source_file: str = None, runtime: str = "inline", profile: bool = False
+    ) -> str:
+        program = self.parse(keep_tokens=PythonEmitter.needs_tokens)
         emitter = PythonEmitter(program.tokens)
-        return emitter.emit(program, is_repl=is_repl, source_file=source_file)
+        return emitter.emit(program, is_repl=is_repl, source_file=source_file, runtime=runtime, profile=profile)
 
 
-def transpile(source: str, is_repl: bool = False, source_file: str = None) -> str:
-    return OPNTranspiler(source).transpile(is_repl=is_repl, source_file=source_file)
+def transpile(
+    source: str, is_repl: bool = False, source_file: str = None, runtime: str = "inline", profile: bool = False
+) -> str:
+    return OPNTranspiler(source).transpile(is_repl=is_repl, source_file=source_file, runtime=runtime, profile=profile)
 
 
-def transpile_path(path: str) -> str:
+def transpile_path(path: str, runtime: str = "inline", profile: bool = False) -> str:
     with open(path, "r", encoding="utf-8") as handle:
-        return transpile(handle.read(), source_file=path)
+        return transpile(handle.read(), source_file=path, runtime=runtime, profile=profile)
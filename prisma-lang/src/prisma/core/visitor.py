@@ -1,17 +1,22 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Generic, Iterable, List, Optional, TypeVar
+from dataclasses import dataclass, field
+from typing import Generic, Iterable, List, Optional, Sequence, TypeVar
 
 
+@dataclass(slots=True)
 class Node:
-    pass
+    # Posición del primer token del nodo en el código fuente (0 si es sintético).
+    line: int = field(default=0, kw_only=True, compare=False, repr=False)
+    column: int = field(default=0, kw_only=True, compare=False, repr=False)
 
 
+@dataclass(slots=True)
 class Statement(Node):
     pass
 
 
+@dataclass(slots=True)
 class Expression(Node):
     pass
 
@@ -21,8 +26,8 @@ class Program(Node):
     functions: List['Function']
     statements: List[Statement]
     classes: List['Class']
-    tokens: List
- 
+    tokens: Optional[Sequence]
+
 
 @dataclass(slots=True)
 class Class(Node):
@@ -0,0 +1,187 @@
+"""Importación de código OPN como módulos de Python.
+
+``install()`` añade dos buscadores a ``sys.meta_path``:
+
+* ``OPNPackageFinder`` resuelve ``import nombre`` a un paquete OPN
+  (``opn.import/nombre``, ``~/.opn/packages/nombre`` o uno registrado con
+  ``opn build``). El paquete se ejecuta una sola vez por proceso y se comparte
+  a través de ``sys.modules``, en lugar de copiarse en cada archivo que lo
+  importa. Su código se obtiene, por orden, de ``index.py``/``index.pyc``
+  precompilados por ``opn compile``, de la caché de ``~/.opn/cache`` o
+  transpilando ``index.prisma``.
+
+* ``PrismaFileFinder`` resuelve ``import foo`` a un archivo ``foo.prisma`` en
+  ``sys.path`` (o dentro del ``__path__`` de un paquete de Python). Se
+  transpila la primera vez y el bytecode se guarda junto al fuente en
+  ``__pycache__/foo.prisma.<cache_tag>.pyc``, así que los siguientes imports
+  no vuelven a pasar por el transpilador.
+
+Ambos van al final de ``sys.meta_path``, así que los módulos de Python
+normales tienen prioridad sobre código OPN con el mismo nombre::
+
+    import prisma.importer
+    prisma.importer.install()
+
+    import foo  # foo.prisma
+"""
+
+from __future__ import annotations
+
+import importlib.abc
+import importlib.util
+import sys
+from pathlib import Path
+from types import CodeType, ModuleType
+from typing import Optional
+
+from prisma.core.cache import TranspileCache, read_bytecode, source_stamp, write_bytecode
+from prisma.core.package_loader import PackageLoader
+
+
+def _python_filename(prisma_path: str) -> str:
+    """Nombre con el que se compila el Python generado a partir de ``prisma_path``.
+
+    No puede ser la ruta del .prisma: ``linecache`` leería ese archivo y las
+    trazas mostrarían líneas de OPN con los números del Python generado. Como
+    ``<ruta>.prisma.py`` no existe en disco, ``linecache`` pide el código al
+    ``get_source`` del loader.
+    """
+    return prisma_path + ".py"
+
+
+class OPNPackageFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, package_loader: Optional[PackageLoader] = None) -> None:
+        self.package_loader = package_loader or PackageLoader()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or "." in fullname:
+            return None  # Los paquetes OPN solo existen en el nivel superior
+        package_dir = self.package_loader.find_package(fullname)
+        if package_dir is None:
+            return None
+        loader = OPNPackageLoader(fullname, package_dir, self.package_loader)
+        return importlib.util.spec_from_file_location(
+            fullname, str(package_dir / "index.prisma"), loader=loader
+        )
+
+
+class OPNPackageLoader(importlib.abc.Loader):
+    def __init__(self, name: str, package_dir: Path, package_loader: PackageLoader) -> None:
+        self.name = name
+        self.package_dir = package_dir
+        self.package_loader = package_loader
+        self._python_code: Optional[str] = None
+
+    def create_module(self, spec):
+        return None  # Módulo por defecto
+
+    def exec_module(self, module: ModuleType) -> None:
+        exec(self.get_code(module.__name__), module.__dict__)
+
+    def get_code(self, fullname: str) -> CodeType:
+        compiled = self.package_loader.load_compiled(self.name)
+        if compiled is not None:
+            self._python_code, code = compiled
+            return code
+        index_file = self.package_dir / "index.prisma"
+        source = index_file.read_text(encoding="utf-8")
+        self._python_code, code = TranspileCache().load(
+            source, source_file=str(index_file), runtime="import", filename=_python_filename(str(index_file))
+        )
+        return code
+
+    def get_source(self, fullname: str) -> Optional[str]:
+        # El Python generado (index.py o el transpilado), para las trazas
+        if self._python_code is None:
+            self.get_code(fullname)
+        return self._python_code
+
+
+class PrismaFileFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path=None, target=None):
+        name = fullname.rpartition(".")[2]
+        for entry in sys.path if path is None else path:
+            if not isinstance(entry, str):
+                continue
+            source_file = Path(entry or ".") / f"{name}.prisma"
+            if source_file.is_file():
+                loader = PrismaFileLoader(fullname, str(source_file))
+                return importlib.util.spec_from_file_location(fullname, str(source_file), loader=loader)
+        return None
+
+
+class PrismaFileLoader(importlib.abc.Loader):
+    def __init__(self, name: str, path: str) -> None:
+        self.name = name
+        self.path = path
+        self._python_code: Optional[str] = None
+
+    def create_module(self, spec):
+        return None  # Módulo por defecto
+
+    def exec_module(self, module: ModuleType) -> None:
+        exec(self.get_code(module.__name__), module.__dict__)
+
+    def get_filename(self, fullname: str) -> str:
+        return self.path
+
+    def cache_path(self) -> Path:
+        source_file = Path(self.path)
+        return source_file.parent / "__pycache__" / f"{source_file.name}.{sys.implementation.cache_tag}.pyc"
+
+    def get_code(self, fullname: str) -> CodeType:
+        source = Path(self.path).read_text(encoding="utf-8")
+        # La marca cubre el fuente y el transpilador: si cambia cualquiera, el .pyc no vale.
+        stamp = source_stamp(source)
+        cache_path = self.cache_path()
+        code = read_bytecode(cache_path, stamp)
+        if code is not None and code.co_filename == _python_filename(self.path):
+            return code
+
+        self._python_code, code = TranspileCache().load(
+            source, source_file=self.path, runtime="import", filename=_python_filename(self.path)
+        )
+        if not sys.dont_write_bytecode:
+            try:
+                cache_path.parent.mkdir(exist_ok=True)
+                write_bytecode(cache_path, stamp, code)
+            except OSError:
+                pass  # Directorio de solo lectura: se transpila (o se usa la caché) la próxima vez
+        return code
+
+    def get_source(self, fullname: str) -> Optional[str]:
+        if self._python_code is None:
+            source = Path(self.path).read_text(encoding="utf-8")
+            self._python_code = TranspileCache().transpile(source, source_file=self.path, runtime="import")
+        return self._python_code
+
+
+_FINDERS = (OPNPackageFinder, PrismaFileFinder)
+
+
+def is_opn_package(module: ModuleType) -> bool:
+    """Indica si ``module`` es un paquete OPN cargado por ``OPNPackageFinder``."""
+    spec = getattr(module, "__spec__", None)
+    return spec is not None and isinstance(spec.loader, OPNPackageLoader)
+
+
+def install() -> None:
+    """Registra los buscadores de paquetes OPN y archivos .prisma (una sola vez por proceso)."""
+    for finder_class in _FINDERS:
+        if not any(isinstance(finder, finder_class) for finder in sys.meta_path):
+            sys.meta_path.append(finder_class())
+
+
+def uninstall() -> None:
+    sys.meta_path[:] = [finder for finder in sys.meta_path if not isinstance(finder, _FINDERS)]
+
+
+__all__ = [
+    "OPNPackageFinder",
+    "OPNPackageLoader",
+    "PrismaFileFinder",
+    "PrismaFileLoader",
+    "install",
+    "is_opn_package",
+    "uninstall",
+]
@@ -0,0 +1,119 @@
+"""Helpers de ejecución que usa el código Python generado por el transpilador.
+
+Este módulo es la única fuente de los helpers: con ``runtime="inline"`` el
+emisor copia en el módulo generado solo las definiciones que el programa usa,
+y con ``runtime="import"`` las importa desde aquí.
+"""
+
+import atexit
+import time
+import random
+
+# nombre de función -> [llamadas, segundos acumulados]
+_PROFILING_DATA = {}
+
+
+def _profiling_report():
+    """Imprime al salir una tabla con las muestras acumuladas por el profiler."""
+    if not _PROFILING_DATA:
+        return
+    rows = sorted(_PROFILING_DATA.items(), key=lambda item: item[1][1], reverse=True)
+    width = max(len("function"), *(len(name) for name, _ in rows))
+    print(f"[PROFILE] {'function':<{width}}  {'calls':>8}  {'total ms':>12}  {'avg ms':>10}")
+    for name, (calls, total) in rows:
+        print(f"[PROFILE] {name:<{width}}  {calls:>8}  {total * 1000:>12.3f}  {total * 1000 / calls:>10.4f}")
+
+
+def profiler(func):
+    """Acumula llamadas y tiempo (inclusivo) de ``func``; el resumen se imprime al salir."""
+    name = func.__name__
+    perf_counter = time.perf_counter
+    # Registrar el resumen una sola vez aunque se decoren varias funciones.
+    atexit.unregister(_profiling_report)
+    atexit.register(_profiling_report)
+
+    def wrapper(*args, **kwargs):
+        start_time = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats = _PROFILING_DATA.get(name)
+            if stats is None:
+                stats = _PROFILING_DATA[name] = [0, 0.0]
+            stats[0] += 1
+            stats[1] += perf_counter() - start_time
+    wrapper.__name__ = name
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def c_printf(format_string, *values):
+    print(format_string % values)
+
+
+def cpp_cout(value):
+    print(value)
+
+
+def cs_write_line(value):
+    print(value)
+
+
+def py_print(*values):
+    print(*values)
+
+
+def py_breakpoint():
+    breakpoint()
+
+
+def py_input(prompt=""):
+    return input(prompt)
+
+
+def py_random_randint(a, b):
+    return random.randint(a, b)
+
+
+_styles = []
+
+
+def css_set(selector, prop, value):
+    rule = f"{selector} {{ {prop}: {value}; }}"
+    _styles.append(rule)
+    print(f"css: {rule}")
+
+
+def js_log(value):
+    print(f"js: {value}")
+
+
+def to_string(value):
+    return str(value)
+
+
+def to_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+    except TypeError:
+        raise ValueError("Cannot convert value to number")
+    except Exception as exc:
+        raise ValueError("Cannot convert value to number") from exc
+
+
+__all__ = [
+    "profiler",
+    "c_printf",
+    "cpp_cout",
+    "cs_write_line",
+    "py_print",
+    "py_breakpoint",
+    "py_input",
+    "py_random_randint",
+    "css_set",
+    "js_log",
+    "to_string",
+    "to_number",
+]
@@ -1,5 +1,14 @@
-from . import cli
-from . import repl
-from . import editor
+import importlib
+
+# Los submódulos se cargan al usarse (PEP 562): importar 'prisma.tools.cli'
+# no debe arrastrar el REPL (colorama) ni el editor (tkinter).
+_SUBMODULES = ("cli", "repl", "editor")
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["cli", "repl", "editor"]
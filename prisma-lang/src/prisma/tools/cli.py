@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import argparse
+import json
 import sys
 from pathlib import Path
+from types import CodeType
 import os
 
 # --- Solución al ImportError ---
@@ -11,21 +13,13 @@ import os
 if __name__ == "__main__" and __package__ is None:
     src_dir = Path(__file__).resolve().parents[2]
     sys.path.insert(0, str(src_dir))
-    from prisma.core import TranspilerError, transpile
-    from prisma.tools.repl import run_repl
-    from prisma.api import pygfx_api
-    from prisma.api import server_api
-    from prisma.api import compilation_api
-    from prisma.api import config_api
-    import cmd
-else:
-    from prisma.core import TranspilerError, transpile
-    from prisma.tools.repl import run_repl
-    from prisma.api import pygfx_api
-    from prisma.api import server_api
-    from prisma.api import compilation_api
-    from prisma.api import config_api
-    import cmd
+
+# Solo el transpilador se importa al arrancar. Los demás subsistemas (gráficos
+# con tkinter, servidor HTTP, compilación, configuración, REPL con colorama)
+# se importan dentro del subcomando que los usa.
+from prisma.core import TranspilerError, TranspileCache, transpile
+
+COMMANDS = ["run", "package", "transpile", "cache", "editor", "compile", "build", "config", "fix-paths"]
 
 
 def read_source(path: str) -> str:
@@ -38,33 +32,78 @@ def write_output(path: str, content: str) -> None:
     Path(path).write_text(content, encoding="utf-8")
 
 
-def run_code(code: str) -> None:
-    # 1. Creamos el diccionario de nombres (namespace) para la ejecución.
-    # 2. Es CRUCIAL inyectar el módulo 'pygfx_api' con el nombre 'gfx',
-    #    ya que el código transpiliado lo busca directamente como 'gfx'.
-    namespace = {
-        "__name__": "__main__",
-        "gfx": pygfx_api,
-        "server": server_api # <--- ¡Inyectamos la API del servidor aquí!
-    }
-    
+def run_code(
+    code: str | CodeType, headless: bool = False, gfx_backend: str | None = None, gfx_output: str | None = None
+) -> None:
+    # El código transpilado importa 'gfx' y 'server' por sí mismo cuando los
+    # usa, así que un script que no dibuja no carga pygfx_api ni tkinter.
+    namespace = {"__name__": "__main__"}
+    if headless or gfx_backend is not None:
+        from prisma.api import pygfx_api
+        if gfx_backend == "raster":
+            pygfx_api.set_backend("raster", output_dir=gfx_output)
+        else:
+            pygfx_api.set_backend(gfx_backend or "null")
+
     try:
-        # 1. Inicializa la API de gráficos
-        pygfx_api.init()
-        # 2. Ejecutamos el código transpiliado del usuario
-        exec(compile(code, "<opn>", "exec"), namespace)
-        
-        # 3. Si se creó una ventana de Tkinter, iniciamos su bucle principal.
-        if pygfx_api._ROOT is not None:
-            print("[GFX TK] Iniciando bucle de eventos de Tkinter...")
-            pygfx_api._ROOT.mainloop()
+        # 1. Ejecutamos el código transpiliado del usuario (ya compilado si viene de la caché)
+        if isinstance(code, str):
+            code = compile(code, "<opn>", "exec")
+        exec(code, namespace)
+
+        # 2. Si el script abrió una ventana, iniciamos su bucle principal.
+        pygfx_api = sys.modules.get("prisma.api.pygfx_api")
+        if pygfx_api is not None and pygfx_api._BACKEND is not None:
+            pygfx_api.flush()  # Lo dibujado después del último update_screen()
+            pygfx_api._BACKEND.mainloop()
     finally:
-        # 4. Nos aseguramos de que Tkinter se cierre correctamente, incluso si hay un error
-        pygfx_api.quit()
+        # 3. Nos aseguramos de que el backend se cierre correctamente, incluso si hay un error
+        pygfx_api = sys.modules.get("prisma.api.pygfx_api")
+        if pygfx_api is not None:
+            pygfx_api.quit()
+
+
+def startup_profile(argv: list[str], top: int = 15) -> int:
+    """Ejecuta ``opn <argv>`` con ``-X importtime`` y resume el coste de los imports.
+
+    Se relanza el intérprete para medir el arranque real, sin los módulos que
+    este proceso ya tiene cargados.
+    """
+    import subprocess
+    import time
+
+    src_dir = str(Path(__file__).resolve().parents[2])
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+    command = [sys.executable, "-X", "importtime", "-m", "prisma.tools.cli", *argv]
+
+    start = time.perf_counter()
+    completed = subprocess.run(command, env=env, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+
+    imports = []  # (acumulado µs, propio µs, módulo)
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            print(line, file=sys.stderr)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Cabecera de la tabla
+        imports.append((int(fields[1]), int(fields[0]), fields[2].strip()))
+
+    print("\n=== Startup profile ===", file=sys.stderr)
+    print(f"  Command: opn {' '.join(argv)}", file=sys.stderr)
+    print(f"  Wall time: {elapsed * 1000:.1f} ms", file=sys.stderr)
+    print(f"  Imports: {len(imports)} modules, {sum(own for _, own, _ in imports) / 1000:.1f} ms", file=sys.stderr)
+    print(f"  {'cumulative':>12} {'self':>10}  module", file=sys.stderr)
+    for cumulative, own, module in sorted(imports, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:>9.1f} ms {own / 1000:>7.1f} ms  {module}", file=sys.stderr)
+    return completed.returncode
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="OPN Language - Transpile and execute OPN code")
+    parser.add_argument("--startup-profile", action="store_true", help="Run the command under 'python -X importtime' and print the slowest imports")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     run_parser = subparsers.add_parser("run", help="Run a .prisma script or start the REPL (default)")
@@ -73,11 +112,24 @@ def build_parser() -> argparse.ArgumentParser:
     )
     run_parser.add_argument("-o", "--output", help="Write the generated Python to the given file")
     run_parser.add_argument("--no-run", action="store_true", help="Only transpile the code without executing it.")
+    run_parser.add_argument("--runtime", choices=["inline", "import"], default="inline", help="Inline the runtime helpers used by the script or import them from prisma.runtime (default: inline)")
+    run_parser.add_argument("--profile", action="store_true", help="Decorate functions with @profiler and print a timing summary at exit")
+    run_parser.add_argument("--no-cache", action="store_true", help="Always transpile, ignoring the on-disk cache in ~/.opn/cache")
+    run_parser.add_argument("--headless", action="store_true", help="Never open a window: gfx calls are only counted (also used automatically when there is no display)")
+    run_parser.add_argument("--gfx-backend", choices=["tk", "null", "raster"], help="Graphics backend for gfx calls (default: tk)")
+    run_parser.add_argument("--gfx-output", metavar="DIR", help="With --gfx-backend raster, write every frame to DIR as PNG")
     
     transpile_parser = subparsers.add_parser("transpile", help="Transpile OPN code to Python without executing")
-    transpile_parser.add_argument("source", help="Path to a .prisma or .opn file")
-    transpile_parser.add_argument("-o", "--output", help="Output file for generated Python code")
+    transpile_parser.add_argument("source", nargs="?", default=None, help="Path to a .prisma or .opn file")
+    transpile_parser.add_argument("-o", "--output", help="Output file for generated Python code (output directory with --batch)")
+    transpile_parser.add_argument("--batch", metavar="DIR_OR_GLOB", help="Transpile every .prisma file in a directory (or matching a glob) and print a JSON summary")
+    transpile_parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for --batch (0 = one per CPU, default: 1)")
+    transpile_parser.add_argument("--runtime", choices=["inline", "import"], default="inline", help="Inline the runtime helpers used by the script or import them from prisma.runtime (default: inline)")
+    transpile_parser.add_argument("--profile", action="store_true", help="Decorate functions with @profiler and print a timing summary at exit")
     
+    cache_parser = subparsers.add_parser("cache", help="Manage the on-disk transpile cache")
+    cache_parser.add_argument("cache_action", choices=["clear", "stats"], help="Cache action")
+
     editor_parser = subparsers.add_parser("editor", help="Launch the OPN Editor GUI")
 
     package_parser = subparsers.add_parser("package", help="Manage OPN packages")
@@ -91,6 +143,9 @@ def build_parser() -> argparse.ArgumentParser:
     compile_parser.add_argument("-v", "--version", default="1.0.0", help="Package version (default: 1.0.0)")
     compile_parser.add_argument("-d", "--description", default="", help="Package description")
     compile_parser.add_argument("-a", "--author", default="", help="Package author")
+    compile_parser.add_argument("--force", action="store_true", help="Rebuild every file, ignoring the build manifest")
+    compile_parser.add_argument("--precompile", action="store_true", help="Also write index.py/index.pyc so imports skip transpiling (re-transpiles the whole package)")
+    compile_parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for reading and extracting files (0 = one per CPU, default: 1)")
 
     build_parser = subparsers.add_parser("build", help="Quick build package from directory")
     build_parser.add_argument("source", help="Source directory with .prisma files")
@@ -120,18 +175,22 @@ def main(argv: list[str] | None = None) -> int:
     parser = build_parser()
     
     raw_argv = argv or sys.argv[1:]
-    if raw_argv and not raw_argv[0].startswith("-") and raw_argv[0] not in ["run", "package", "transpile", "editor", "compile", "build", "config", "fix-paths"]:
+    if "--startup-profile" in raw_argv:
+        return startup_profile([arg for arg in raw_argv if arg != "--startup-profile"])
+    if raw_argv and not raw_argv[0].startswith("-") and raw_argv[0] not in COMMANDS:
         raw_argv = ["run"] + raw_argv
     
     args = parser.parse_args(raw_argv if argv is None else argv)
     cmd = args.command
 
     if cmd is None:
+        from prisma.tools.repl import run_repl
         run_repl()
         return 0
 
     if cmd == "run":
         if args.source is None:
+            from prisma.tools.repl import run_repl
             run_repl()
             return 0
         try:
@@ -142,24 +201,50 @@ def main(argv: list[str] | None = None) -> int:
                 print(f"Warning: File extension '{file_ext}' is not standard. Use .prisma for code or .opn for data.", file=sys.stderr)
             
             source = read_source(source_path)
-            python_code = transpile(source, source_file=source_path)
+            if args.no_cache:
+                python_code = transpile(source, source_file=source_path, runtime=args.runtime, profile=args.profile)
+                code = python_code
+            else:
+                python_code, code = TranspileCache().load(
+                    source, source_file=source_path, runtime=args.runtime, profile=args.profile
+                )
 
             if args.output:
                 write_output(args.output, python_code)
 
             if not args.no_run and not args.output:
-                run_code(python_code)
+                run_code(code, headless=args.headless, gfx_backend=args.gfx_backend, gfx_output=args.gfx_output)
             elif not args.no_run and args.output is None:
                 sys.stdout.write(python_code)
         except (FileNotFoundError, TranspilerError) as e:
             print(f"Error: {e}", file=sys.stderr)
             return 1
     
+    elif cmd == "transpile" and args.batch:
+        if args.source is not None or not args.output:
+            print("Error: --batch takes no source file and requires -o <output_dir>", file=sys.stderr)
+            return 1
+        from prisma.core.batch import collect_sources, transpile_many
+        sources = collect_sources(args.batch)
+        if not sources:
+            print(f"Error: No source files match: {args.batch}", file=sys.stderr)
+            return 1
+        root = args.batch if Path(args.batch).is_dir() else None
+        summary = transpile_many(
+            sources, output_dir=args.output, jobs=args.jobs, runtime=args.runtime, profile=args.profile, root=root
+        )
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return 1 if summary["failed"] else 0
+
     elif cmd == "transpile":
+        if args.source is None:
+            print("Error: transpile requires a source file or --batch", file=sys.stderr)
+            return 1
         try:
             source_path = args.source
             source = read_source(source_path)
-            python_code = transpile(source, source_file=source_path)
+            python_code = transpile(source, source_file=source_path, runtime=args.runtime, profile=args.profile)
             
             if args.output:
                 write_output(args.output, python_code)
@@ -170,6 +255,17 @@ def main(argv: list[str] | None = None) -> int:
             print(f"Error: {e}", file=sys.stderr)
             return 1
     
+    elif cmd == "cache":
+        cache = TranspileCache()
+        if args.cache_action == "clear":
+            removed = cache.clear()
+            print(f"Removed {removed} cached files from {cache.cache_dir}")
+        else:
+            stats = cache.stats()
+            print(f"Cache: {stats['path']}")
+            print(f"  Entries: {stats['entries']} ({stats['files']} files)")
+            print(f"  Size: {stats['bytes'] / 1024:.1f} KiB of {stats['max_bytes'] / (1024 * 1024):.0f} MiB")
+
     elif cmd == "editor":
         try:
             from prisma.tools.editor import main as editor_main
@@ -184,19 +280,23 @@ def main(argv: list[str] | None = None) -> int:
                 print(f"Error: Project path does not exist: {args.project_path}", file=sys.stderr)
                 return 1
             
+            from prisma.api import compilation_api
             result = compilation_api.compile_project(
                 project_path=args.project_path,
                 output_dir=args.output,
                 name=args.name,
                 version=args.version,
                 description=args.description,
-                author=args.author
+                author=args.author,
+                incremental=not args.force,
+                jobs=args.jobs,
+                precompile=args.precompile
             )
             
             print(f"✓ Compilation successful!")
             print(f"  Project: {result['project_path']}")
             print(f"  Output: {result['output_path']}")
-            print(f"  Source files: {result['source_files']}")
+            print(f"  Source files: {result['source_files']} ({result['files_changed']} changed)")
             print(f"  Functions extracted: {result['functions']}")
             print(f"  Files generated: {result['files_generated']}")
             
@@ -210,6 +310,7 @@ def main(argv: list[str] | None = None) -> int:
                 print(f"Error: Source path does not exist: {args.source}", file=sys.stderr)
                 return 1
             
+            from prisma.api import compilation_api
             result = compilation_api.quick_compile(
                 source_path=args.source,
                 package_name=args.name,
@@ -228,6 +329,7 @@ def main(argv: list[str] | None = None) -> int:
     
     elif cmd == "config":
         try:
+            from prisma.api import config_api
             config_manager = config_api.ConfigManager()
             
             if args.config_action == "init":
@@ -277,6 +379,7 @@ def main(argv: list[str] | None = None) -> int:
     
     elif cmd == "fix-paths":
         try:
+            from prisma.api import config_api
             config_manager = config_api.ConfigManager()
             result = config_manager.auto_correct_project(args.project_path)
             
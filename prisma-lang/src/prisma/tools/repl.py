@@ -26,9 +26,10 @@ def run_repl() -> None:
     print(" - Type `!command` to run a shell command (e.g., `!dir`).")
     print(" - Type `exit` or `exit;` or press Ctrl+D to quit.")
 
-    # Prepare a persistent namespace and execute the standard library preamble
+    # Prepare a persistent namespace preloaded with the whole runtime: REPL
+    # snippets are transpiled without a preamble.
     namespace = {"__name__": "__main__"}
-    exec(compile(transpile(""), "<opn-preamble>", "exec"), namespace)
+    exec(compile("import time\nimport random\nfrom prisma.runtime import *", "<opn-preamble>", "exec"), namespace)
 
     buffer: list[str] = []
     while True:
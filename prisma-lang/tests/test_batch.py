@@ -0,0 +1,14 @@
+from prisma.core import transpile_many
+
+
+def test_unexpected_errors_are_recorded_per_file(tmp_path):
+    # Un anidamiento muy profundo agota la recursión del parser; el lote sigue.
+    (tmp_path / "deep.prisma").write_text("main { let x = " + "(" * 5000 + "1" + ")" * 5000 + "; }", encoding="utf-8")
+    (tmp_path / "ok.prisma").write_text('main { py.print("hola"); }', encoding="utf-8")
+
+    summary = transpile_many(sorted(tmp_path.glob("*.prisma")))
+
+    assert (summary["succeeded"], summary["failed"]) == (1, 1)
+    deep, ok = summary["files"]
+    assert deep["error"].startswith("RecursionError: ")
+    assert ok["error"] is None and "hola" in ok["python_code"]
@@ -0,0 +1,96 @@
+import importlib.util
+import marshal
+import os
+
+import pytest
+
+from prisma.core import cache as cache_module
+from prisma.core.cache import TranspileCache
+
+SOURCE = 'main {\n    py.print("hola");\n}\n'
+
+
+@pytest.fixture
+def transpile_calls(monkeypatch):
+    calls = []
+    real = cache_module.transpile
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(cache_module, "transpile", counting)
+    return calls
+
+
+def test_key_depends_on_runtime_and_profile(tmp_path, transpile_calls):
+    cache = TranspileCache(tmp_path)
+    keys = {
+        cache.key(SOURCE),
+        cache.key(SOURCE, runtime="import"),
+        cache.key(SOURCE, profile=True),
+        cache.key(SOURCE, source_file="x.opn"),
+    }
+    assert len(keys) == 4
+
+    cache.load(SOURCE)
+    cache.load(SOURCE, runtime="import")
+    cache.load(SOURCE, profile=True)
+    assert len(transpile_calls) == 3
+    # Mismas opciones: acierto, sin transpilar otra vez
+    cache.load(SOURCE, profile=True)
+    assert len(transpile_calls) == 3
+
+
+def test_pyc_from_another_python_is_ignored(tmp_path, transpile_calls):
+    cache = TranspileCache(tmp_path)
+    python_code, _ = cache.load(SOURCE, filename="a.prisma.py")
+    key = cache.key(SOURCE)
+    pyc = tmp_path / f"{key}.pyc"
+    pyc.write_bytes(b"\0\0\0\0" + pyc.read_bytes()[len(importlib.util.MAGIC_NUMBER):])
+
+    assert cache.get_code(key, "a.prisma.py") is None
+    again, code = cache.load(SOURCE, filename="a.prisma.py")
+    assert again == python_code and code.co_filename == "a.prisma.py"
+    assert len(transpile_calls) == 1  # El .py sigue valiendo; solo se recompila
+    assert pyc.read_bytes().startswith(importlib.util.MAGIC_NUMBER)
+
+
+def test_pyc_for_another_filename_is_ignored(tmp_path):
+    cache = TranspileCache(tmp_path)
+    cache.load(SOURCE, filename="a.prisma.py")
+    key = cache.key(SOURCE)
+
+    assert cache.get_code(key, "b.prisma.py") is None
+    _, code = cache.load(SOURCE, filename="b.prisma.py")
+    assert code.co_filename == "b.prisma.py"
+
+
+def test_eviction_removes_least_recently_used_entries(tmp_path):
+    code = compile("x = 1", "<opn>", "exec")
+    entry_bytes = len("x = 1") + len(importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+    cache = TranspileCache(tmp_path, max_bytes=2 * entry_bytes)
+    cache.put("a", "x = 1", code)
+    cache.put("b", "x = 1", code)
+    for name, age in (("a", 300), ("b", 200)):
+        for suffix in (".py", ".pyc"):
+            stamp = os.stat(tmp_path / f"{name}{suffix}").st_mtime - age
+            os.utime(tmp_path / f"{name}{suffix}", (stamp, stamp))
+    cache.get("a")  # "a" pasa a ser la más reciente
+
+    cache.put("c", "x = 1", code)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.py", "a.pyc", "c.py", "c.pyc"]
+
+
+def test_stats_and_clear(tmp_path):
+    cache = TranspileCache(tmp_path, max_bytes=1234)
+    cache.load(SOURCE)
+    cache.transpile(SOURCE, runtime="import")  # Solo .py
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["files"], stats["max_bytes"]) == (2, 3, 1234)
+    assert stats["bytes"] == sum(path.stat().st_size for path in tmp_path.iterdir())
+
+    assert cache.clear() == 3
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,84 @@
+import json
+
+from prisma.api.compilation_api import compile_project
+
+
+def make_project(root):
+    source = root / "src"
+    source.mkdir()
+    (source / "a.prisma").write_text("# Suma dos números\nfunc add(a, b) {\n    return a + b;\n}\n", encoding="utf-8")
+    (source / "b.prisma").write_text("func twice(x) {\n    return x * 2;\n}\n", encoding="utf-8")
+    return source
+
+
+def make_larger_project(root):
+    source = make_project(root)
+    (source / "lib").mkdir()
+    for i in range(6):
+        (source / "lib" / f"m{i}.prisma").write_text(
+            f"// Módulo {i}\nfunc f{i}(x, y) {{\n    return x + {i};\n}}\n\nfunc g{i}() {{\n    return {i};\n}}\n",
+            encoding="utf-8",
+        )
+    return source
+
+
+def build_outputs(output):
+    """index.prisma y functions.json sin las marcas de tiempo."""
+    index = [
+        line for line in (output / "index.prisma").read_text(encoding="utf-8").split("\n")
+        if not line.startswith("// Generated:")
+    ]
+    functions = json.loads((output / "functions.json").read_text(encoding="utf-8"))
+    del functions["metadata"]["generatedAt"]
+    return index, functions
+
+
+def test_unchanged_build_restores_missing_outputs(tmp_path):
+    source = make_project(tmp_path)
+    output = tmp_path / "out"
+    compile_project(str(source), str(output), name="demo")
+
+    (output / "index.prisma").unlink()
+    (output / "functions.json").unlink()
+    compile_project(str(source), str(output), name="demo")
+
+    assert "func twice(x)" in (output / "index.prisma").read_text(encoding="utf-8")
+    assert (output / "functions.json").exists()
+
+
+def test_precompile_after_plain_build_writes_compiled_files(tmp_path):
+    source = make_project(tmp_path)
+    output = tmp_path / "out"
+    compile_project(str(source), str(output), name="demo")
+    assert not (output / "index.py").exists()
+
+    result = compile_project(str(source), str(output), name="demo", precompile=True)
+
+    assert result["files_changed"] == 0
+    assert result["files_generated"] == 2
+    assert (output / "index.py").exists() and (output / "index.pyc").exists()
+    # Ya al día: la siguiente no escribe nada
+    assert compile_project(str(source), str(output), name="demo", precompile=True)["files_generated"] == 0
+
+
+def test_parallel_build_matches_serial_build(tmp_path):
+    source = make_larger_project(tmp_path)
+    compile_project(str(source), str(tmp_path / "serial"), name="demo", jobs=1)
+    compile_project(str(source), str(tmp_path / "parallel"), name="demo", jobs=2)
+
+    assert build_outputs(tmp_path / "parallel") == build_outputs(tmp_path / "serial")
+
+
+def test_incremental_build_after_edit_matches_forced_build(tmp_path):
+    source = make_larger_project(tmp_path)
+    incremental = tmp_path / "incremental"
+    compile_project(str(source), str(incremental), name="demo")
+
+    (source / "lib" / "m3.prisma").write_text(
+        "# Cambiado\nfunc h3(a) {\n    return a;\n}\n", encoding="utf-8"
+    )
+    result = compile_project(str(source), str(incremental), name="demo")
+    compile_project(str(source), str(tmp_path / "forced"), name="demo", incremental=False)
+
+    assert result["files_changed"] == 1
+    assert build_outputs(incremental) == build_outputs(tmp_path / "forced")
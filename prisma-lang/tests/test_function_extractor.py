@@ -0,0 +1,37 @@
+from prisma.api.compilation_api import FunctionExtractor
+
+
+def describe(code):
+    return {func["name"]: func["description"] for func in FunctionExtractor().extract_with_documentation(code)}
+
+
+def test_line_comments_directly_above_describe_the_function():
+    code = (
+        "# Suma dos números\n# y devuelve el total\nfunc add(a, b) {\n    return a + b;\n}\n\n"
+        "// Resta\nfunc sub(a, b) {\n    return a - b;\n}\n"
+    )
+    assert describe(code) == {"add": "Suma dos números y devuelve el total", "sub": "Resta"}
+
+
+def test_block_comment_describes_the_function():
+    code = "/*\n * Multiplica\n * dos valores\n */\nfunc mul(a, b) {\n    return a * b;\n}\n"
+    assert describe(code) == {"mul": "Multiplica dos valores"}
+
+
+def test_blank_line_between_comment_and_func_means_no_description():
+    code = "# Comentario suelto\n\nfunc lonely() {\n    return 1;\n}\n"
+    assert describe(code) == {"lonely": ""}
+
+
+def test_signature_parameters():
+    functions = FunctionExtractor().extract_functions("func f(a, /* nota */ b) {\n}\n")
+    assert [param["name"] for param in functions[0]["parameters"]] == ["a", "b"]
+
+
+def test_unterminated_string_returns_functions_extracted_so_far():
+    # El lexer se detiene en la cadena sin cerrar: lo que viene después no se extrae.
+    code = (
+        '# Primera\nfunc first() {\n    return "ok";\n}\n\n'
+        'func broken() {\n    return "sin cerrar;\n}\n\nfunc after() {\n}\n'
+    )
+    assert describe(code) == {"first": "Primera", "broken": ""}
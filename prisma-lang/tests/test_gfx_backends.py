@@ -0,0 +1,90 @@
+import sys
+import types
+
+import pytest
+
+tkinter = pytest.importorskip("tkinter")
+
+from prisma.api.gfx_backends import (  # noqa: E402
+    CIRCLE,
+    CIRCLES,
+    POINT_SET,
+    POINTS,
+    RECT,
+    RasterBackend,
+    TkBackend,
+    hex_to_rgb,
+)
+
+WIDTH, HEIGHT = 60, 40
+
+
+class FakePhoto:
+    """Capa de TkBackend sobre un intérprete Tcl real (sin display).
+
+    El comando de la imagen se registra en Tcl, así que el script que genera
+    ``draw_batch`` se evalúa de verdad y cada ``put`` pinta ``pixels``.
+    """
+
+    count = 0
+
+    def __init__(self, interpreter, width, height, **options):
+        FakePhoto.count += 1
+        self.name = f"fakeimage{FakePhoto.count}"
+        self.width, self.height = width, height
+        self.pixels = bytearray(RasterBackend().background * (width * height))
+        interpreter.createcommand(self.name, self._command)
+
+    def __str__(self):
+        return self.name
+
+    def _command(self, operation, color, option, *box):
+        assert (operation, option) == ("put", "-to")
+        left, top, right, bottom = map(int, box)
+        rgb = hex_to_rgb(color)
+        for row in range(top, bottom):
+            start = (row * self.width + left) * 3
+            self.pixels[start:start + (right - left) * 3] = rgb * (right - left)
+
+    def blank(self):
+        pass
+
+
+@pytest.fixture
+def tk_backend(monkeypatch):
+    interpreter = tkinter.Tcl()
+    root = types.SimpleNamespace(
+        tk=interpreter.tk, withdraw=lambda: None, deiconify=lambda: None, title=lambda t: None
+    )
+    canvas = types.SimpleNamespace(pack=lambda: None, create_image=lambda *a, **k: None)
+    fake = types.SimpleNamespace(
+        Tk=lambda: root,
+        Canvas=lambda *a, **k: canvas,
+        PhotoImage=lambda **options: FakePhoto(interpreter, **options),
+        TclError=tkinter.TclError,
+    )
+    monkeypatch.setitem(sys.modules, "tkinter", fake)
+    backend = TkBackend()
+    backend.open(WIDTH, HEIGHT, "test")
+    return backend
+
+
+def test_tk_draws_in_call_order_like_raster(tk_backend):
+    # Un fondo, un círculo encima, puntos, y un rectángulo que tapa parte del círculo.
+    commands = [
+        (RECT, 0, 0, WIDTH, HEIGHT, "#112233"),
+        (CIRCLE, 20, 20, 12, "#e74c3c"),
+        [POINTS, 20, 5, 40, "#2ecc71"],
+        (RECT, 15, 15, 10, 10, "#3498db"),
+        (CIRCLES, [(45, 10, 6, "#f1c40f"), (50, 30, 0, "#ffffff")]),
+        (POINT_SET, [45, 2], [10, 38], "#9b59b6"),
+    ]
+    raster = RasterBackend()
+    raster.open(WIDTH, HEIGHT, "test")
+    raster.draw_batch(commands)
+    tk_backend.draw_batch(commands)
+
+    assert tk_backend.layer.pixels == raster.pixels
+    # El círculo dibujado después del fondo queda encima, no tapado por él.
+    center = (30 * WIDTH + 20) * 3
+    assert bytes(tk_backend.layer.pixels[center:center + 3]) == hex_to_rgb("#e74c3c")
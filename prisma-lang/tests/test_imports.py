@@ -0,0 +1,40 @@
+import sys
+import traceback
+
+import pytest
+
+import prisma.importer
+from prisma.core import transpile
+
+
+def test_import_output_does_not_depend_on_installed_packages(tmp_path, monkeypatch):
+    # La salida se cachea: si el paquete se instala después, debe seguir valiendo.
+    source = "import mypkg;\nmain {\n    py.print(greet());\n}\n"
+    monkeypatch.chdir(tmp_path)
+    before = transpile(source)
+
+    package_dir = tmp_path / "opn.import" / "mypkg"
+    package_dir.mkdir(parents=True)
+    (package_dir / "index.prisma").write_text('func greet() {\n    return "hola";\n}\n', encoding="utf-8")
+
+    assert transpile(source) == before
+    assert "prisma.importer.install()" in before
+    assert "if prisma.importer.is_opn_package(mypkg):" in before
+
+
+def test_traceback_shows_generated_python_lines(tmp_path, monkeypatch):
+    # Las trazas deben enseñar el Python generado, no la línea del .prisma con ese número.
+    (tmp_path / "boom.prisma").write_text(
+        "# comentario\n\nfunc explode(n) {\n    return n / 0;\n}\n", encoding="utf-8"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "boom", raising=False)
+    prisma.importer.install()
+    import boom
+
+    with pytest.raises(ZeroDivisionError) as error:
+        boom.explode(1)
+    frame = traceback.extract_tb(error.value.__traceback__)[-1]
+    assert frame.filename == str(tmp_path / "boom.prisma.py")
+    assert "/ 0" in frame.line
+    monkeypatch.delitem(sys.modules, "boom")
@@ -0,0 +1,28 @@
+import pytest
+
+from prisma.core import LexerError, TranspilerError, transpile
+
+
+# Los errores del lexer aparecen en mitad del análisis (los tokens se generan
+# bajo demanda) y deben llegar con su mensaje, no como "Unexpected token".
+@pytest.mark.parametrize(
+    "source, message",
+    [
+        ('x = "abc', "Unterminated string at line 1, column 5"),
+        ("x = 1 @ 2;", "Unexpected character '@' at line 1, column 7"),
+        ('let s = "a\\qb";', "Unsupported escape sequence '\\q' at line 1, column 9"),
+        ('main { let s = "abc }', "Unterminated string at line 1, column 16"),
+        ("x = 1; /* sin cerrar", "Unterminated block comment at line 1, column 8"),
+    ],
+)
+def test_lexer_errors_keep_their_message(source, message):
+    with pytest.raises(LexerError) as error:
+        transpile(source)
+    assert str(error.value) == message
+
+
+def test_top_level_parser_errors_are_still_rewritten():
+    with pytest.raises(TranspilerError) as error:
+        transpile("x = ;")
+    assert not isinstance(error.value, LexerError)
+    assert "Only 'func', 'main', 'class', or 'import' are allowed at the top level" in str(error.value)
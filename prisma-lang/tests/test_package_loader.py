@@ -0,0 +1,36 @@
+import json
+
+from prisma.core.package_loader import PackageIndex
+
+
+def make_package(directory):
+    directory.mkdir(parents=True)
+    (directory / "index.prisma").write_text("func hi() {\n    return 1;\n}\n", encoding="utf-8")
+    return directory
+
+
+def new_index(tmp_path):
+    # Una instancia nueva lee el índice guardado, como otro proceso
+    return PackageIndex([tmp_path / "opn.import"], tmp_path / "packages.json", tmp_path / "index")
+
+
+def test_removed_index_prisma_is_not_found(tmp_path):
+    package = make_package(tmp_path / "opn.import" / "mypkg")
+    assert new_index(tmp_path).lookup("mypkg") == package
+
+    (package / "index.prisma").unlink()
+
+    assert new_index(tmp_path).lookup("mypkg") is None
+
+
+def test_deleted_registered_package_is_not_found(tmp_path):
+    package = make_package(tmp_path / "elsewhere" / "reg")
+    (tmp_path / "packages.json").write_text(
+        json.dumps({"packages": [{"name": "reg", "path": str(package)}]}), encoding="utf-8"
+    )
+    assert new_index(tmp_path).lookup("reg") == package
+
+    (package / "index.prisma").unlink()
+    package.rmdir()
+
+    assert new_index(tmp_path).lookup("reg") is None
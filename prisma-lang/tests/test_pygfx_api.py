@@ -0,0 +1,62 @@
+import pytest
+
+from prisma.api import pygfx_api
+from prisma.api.gfx_backends import POINTS, BackendUnavailable, NullBackend, RasterBackend
+from prisma.core import transpile
+
+
+class BatchRecorder(RasterBackend):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def draw_batch(self, commands):
+        self.batches.append([list(command) for command in commands])
+        super().draw_batch(commands)
+
+
+def test_contiguous_points_merge_into_one_command():
+    backend = BatchRecorder()
+    pygfx_api.set_backend(backend)
+    try:
+        pygfx_api.setup_canvas(40, 20, "test")
+        for x in range(10):
+            pygfx_api.draw_point(x, 5, "#ff0000")
+        pygfx_api.draw_point(12, 5, "#ff0000")  # Hueco: empieza otro tramo
+        pygfx_api.update_screen()
+    finally:
+        pygfx_api.quit()
+
+    assert backend.batches[-1] == [[POINTS, 5, 0, 9, "#ff0000"], [POINTS, 5, 12, 12, "#ff0000"]]
+
+
+def test_register_palette_from_opn_list_of_pairs():
+    # OPN no tiene literales de diccionario: la paleta se pasa como lista de pares.
+    source = 'main {\n    gfx.register_palette([["naranja", "#ff8800"], ["lima", [50, 205, 50]], ["fondo", "Rojo"]]);\n}\n'
+    namespace = {"__name__": "paleta"}
+    exec(transpile(source), namespace)
+    namespace["main"]()
+
+    assert pygfx_api._get_hex_color("naranja") == "#ff8800"
+    assert pygfx_api._get_hex_color("LIMA") == "#32cd32"
+    assert pygfx_api._get_hex_color("fondo") == pygfx_api._get_hex_color("Rojo")
+
+
+def test_register_palette_rejects_malformed_pairs():
+    with pytest.raises(ValueError, match="par \\[nombre, color\\]"):
+        pygfx_api.register_palette([["solo_nombre"]])
+
+
+def test_headless_fallback_keeps_stdout_clean(monkeypatch, capsys):
+    def unavailable(name, **options):
+        raise BackendUnavailable("sin display")
+
+    monkeypatch.setattr(pygfx_api, "create_backend", unavailable)
+    monkeypatch.setattr(pygfx_api, "_BACKEND_SPEC", ("tk", {}))
+    monkeypatch.setattr(pygfx_api, "_BACKEND", None)
+    pygfx_api.init()
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "[GFX] sin display; modo headless." in captured.err
+    assert isinstance(pygfx_api._BACKEND, NullBackend)
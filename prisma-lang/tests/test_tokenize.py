@@ -0,0 +1,35 @@
+import pytest
+
+from prisma.core import LexerError
+from prisma.core.transpiler import COMMENT, Lexer
+
+
+def as_tuples(tokens):
+    return [(token.kind, token.value, token.line, token.column) for token in tokens]
+
+
+# tokenize e iter_tokens (findall en bloque) deben dar el mismo flujo que _scan.
+@pytest.mark.parametrize(
+    "source",
+    [
+        "",
+        "   \n\t",
+        "main {\r\n    let s = \"a\\nb\";\r\n}\r\n",
+        'func f(a, b) {\n    return "dos\nlíneas" + a..b;  # fin\n}\n// al final',
+        "x = 1.5 /* bloque\n con salto */ != 2. / y;",
+        "x /* sin espacio al final */",
+    ],
+)
+def test_tokenize_matches_streaming_scan(source):
+    buffer = Lexer(source).tokenize()
+    scanned = Lexer(source, keep_comments=True).iter_tokens()  # Recorre _scan
+    expected = as_tuples(token for token in scanned if token.kind != COMMENT)
+    assert as_tuples(Lexer(source).iter_tokens()) == expected
+    assert as_tuples(buffer) == expected
+    assert as_tuples(buffer[i] for i in range(len(buffer))) == expected
+
+
+@pytest.mark.parametrize("method", ["tokenize", "iter_tokens"])
+def test_lexer_reports_errors_with_position(method):
+    with pytest.raises(LexerError, match="Unexpected character '@' at line 2, column 3"):
+        list(getattr(Lexer("x;\n  @ y;"), method)())